@@ -30,7 +30,8 @@ from api.chat.sql_stat.u2a_agent_short_term_memory.utils import (
 )
 from api.llm.generator import DEFAULT_RETRY_CONFIG
 from api.load_balance import LOAD_BLANCER
-from api.load_balance.delegate.openai import generation_delegate_for_async_openai
+from api.load_balance.delegate.openai import resumable_generation_delegate_for_async_openai
+from api.load_balance.rate_limit import estimate_message_tokens
 from api.logger.datamodel import LangFuseSpanAttributes
 from api.logger.time import now_iso
 
@@ -246,15 +247,6 @@ class AgentBase(ABC):
         if tools:
             kwargs["tools"] = tools
 
-        async def delegate(instance):
-            return await generation_delegate_for_async_openai(
-                instance,
-                self._runtime_memories,
-                DEFAULT_RETRY_CONFIG,
-                stream=True,
-                **kwargs,
-            )
-
         langfuse_observation_attributes = LangFuseSpanAttributes(
             observation_type="generation",
             input=ujson.dumps(self._runtime_memories, ensure_ascii=False),
@@ -273,7 +265,18 @@ class AgentBase(ABC):
                 # 循环开始
                 await self.on_iteration_start(iteration)
 
-                result = await LOAD_BLANCER.execute(service_name, delegate)
+                # 流中途断开时切换实例续传, 已转发的 delta 不会重复
+                delegate = resumable_generation_delegate_for_async_openai(
+                    self._runtime_memories,
+                    DEFAULT_RETRY_CONFIG,
+                    stream=True,
+                    **kwargs,
+                )
+                result = LOAD_BLANCER.execute_stream(
+                    service_name,
+                    delegate,
+                    estimated_tokens=estimate_message_tokens(self._runtime_memories),
+                )
 
                 content_chunks = []
                 reasoning_content_chunks = []
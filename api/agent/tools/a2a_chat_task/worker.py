@@ -14,6 +14,8 @@ from .sql_stat.a2a_session.utils import (
     session_exists,
 )
 
+from api.load_balance.admission import Priority, run_with_priority
+
 from .a2a_chat_task import a2a_chat_task
 
 from typing import Any
@@ -70,11 +72,14 @@ class A2AChatTaskWorker:
                 await update_task_status(row.id, "processing")
                 try:
                     task = asyncio.create_task(
-                        a2a_chat_task(
-                            session_id=row.session_id,
-                            session_task_id=row.id,
-                            proactive_side=row.proactive_side,
-                            params=row.parmas,
+                        run_with_priority(
+                            Priority.BACKGROUND,
+                            a2a_chat_task(
+                                session_id=row.session_id,
+                                session_task_id=row.id,
+                                proactive_side=row.proactive_side,
+                                params=row.parmas,
+                            ),
                         )
                     )
                     self.task_pool[row.id] = task
@@ -21,6 +21,7 @@ from uuid import UUID
 import asyncio
 import logfire
 
+from api.load_balance.admission import Priority, request_priority
 from api.redis.pubsub import publish_event
 from api.logger.datamodel import LangFuseTraceAttributes, LangFuseSpanAttributes
 from .phase1_planning import execute_planning_phase
@@ -66,7 +67,9 @@ async def run_background_update_task(user_id: UUID, role_name: str) -> None:
         }
     ) # type: ignore
 
-    with logfire.set_baggage(**langfuse_trace_attributes.model_dump(mode="json", by_alias=True)) as _:
+    # 后台任务的 LLM 请求让位于用户实时对话
+    with request_priority(Priority.BACKGROUND), \
+            logfire.set_baggage(**langfuse_trace_attributes.model_dump(mode="json", by_alias=True)) as _:
         with logfire.span("agent-role-update::task_start") as span:
             try:
                 # ========== 1. 第一阶段：计划更新任务 ==========
@@ -1,8 +1,7 @@
 from .processor_base import ProcessorBase
 from ..data_model import SplitConfig, SplitType, KamradtChunkConfig, LengthLimitConfig
 from api.load_balance import LOAD_BLANCER, QWEN_TEXT_EMBEDDING_SERVICE_NAME
-from api.llm.generator import DEFAULT_RETRY_CONFIG
-from api.load_balance.delegate.openai import embedding_delegate_for_async_openai
+from api.load_balance.embedding_batcher import embed_with_cache
 from .seg_any_text import split_into_sentences
 
 import numpy as np
@@ -43,19 +42,14 @@ class KamradtChunkProcessor(ProcessorBase):
             merged_sentences = self.sentences
         
         # calculate embeddings
-        async def delegate(instance):
-            return await embedding_delegate_for_async_openai(
-                instance,
-                merged_sentences,
-                DEFAULT_RETRY_CONFIG
-            )
-        
-        res = await LOAD_BLANCER.execute(
+        # 同一文档重复切分时只对新句子请求 embedding
+        res = await embed_with_cache(
+            LOAD_BLANCER,
             QWEN_TEXT_EMBEDDING_SERVICE_NAME,
-            delegate
+            merged_sentences,
         )
 
-        self.sentences_embeddings = [np.array(embedding.embedding) for embedding in res.data]
+        self.sentences_embeddings = [np.array(embedding) for embedding in res]
         self.sentences_embeddings = np.stack(self.sentences_embeddings)
 
         # calculate cosine distances to previous embeddings
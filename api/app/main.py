@@ -18,6 +18,8 @@ from fastapi.responses import JSONResponse
 import json
 
 from api.app.graceful_shutdown import wait_background_task_for_graceful_shutdown
+from api.graph_executor import Graph
+from api.llm.http_transport import SHARED_HTTP_CLIENTS
 
 # from api.app.chunk import router as chunk_router
 # from api.app.document import router as document_router
@@ -48,10 +50,17 @@ async def lifespan(app: FastAPI):
     print("Starting server...")
     init_logger()
 
+    # pools for graph nodes offloading cpu bound compute
+    Graph.node_executors.start()
+    # shared http connection pools of the llm providers
+    SHARED_HTTP_CLIENTS.start()
+
     # code before yield will be executed before the server starts
     yield
     # code after yield will be executed after the server stops
     await wait_background_task_for_graceful_shutdown()
+    Graph.node_executors.shutdown()
+    await SHARED_HTTP_CLIENTS.aclose()
 
 app = FastAPI(
     root_path="/api",
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from typing import List
 import logfire
@@ -15,7 +17,7 @@ from api.vector_db.weaviate.simple_text.simple_text_sync import SimpleTextVector
 from api.vector_db.weaviate.simple_text.simple_text_def import SIMPLE_TEXT_OBEJECT_SCHEMA
 from api.vector_db.weaviate.init_impl import create_collection_or_tenant
 from api.load_balance.constant import LOAD_BLANCER, QWEN_TEXT_EMBEDDING_SERVICE_NAME
-from api.load_balance.delegate.openai import embedding_delegate_for_async_openai
+from api.load_balance.embedding_batcher import EmbeddingMicroBatcher
 
 __all__ = ["router"]
 
@@ -89,13 +91,17 @@ async def create_vector_objects(objs: List[VectorObjectCreate]):
             tenant_name=tenant_name
         )
         
+        # 如果没有提供向量，则使用通义千问嵌入服务生成向量
+        # 并发发起, 由 _EMBEDDING_BATCHER 合并为批量请求
+        generated = await asyncio.gather(*[
+            _generate_embedding(obj.text) for obj in objs if obj.vector is None
+        ])
+        generated_iter = iter(generated)
+
         vector_objs = []
         for obj in objs:
-            # 如果没有提供向量，则使用通义千问嵌入服务生成向量
-            vector = obj.vector
-            if vector is None:
-                vector = await _generate_embedding(obj.text)
-                
+            vector = obj.vector if obj.vector is not None else next(generated_iter)
+
             vector_obj = SimpleTextObeject_Weaviate(
                 text=obj.text,
                 collection_name=obj.collection_name,
@@ -236,22 +242,16 @@ async def delete_objects_by_metadata(request: DeleteByMetadataRequest, collectio
         raise HTTPException(status_code=500, detail=f"Failed to delete objects by metadata: {str(e)}")
 
 
+# 合并并发请求的单条文本, 以一次列表输入的请求生成 embedding
+_EMBEDDING_BATCHER = EmbeddingMicroBatcher(LOAD_BLANCER, QWEN_TEXT_EMBEDDING_SERVICE_NAME)
+
+
 async def _generate_embedding(text: str) -> List[float]:
     """
     使用通义千问嵌入服务生成文本的向量表示
     """
-    async def _embed_request(service_instance):
-        return (await embedding_delegate_for_async_openai(
-            service_instance=service_instance,
-            text=text,
-        )).data
-    
     try:
-        embeddings = await LOAD_BLANCER.execute(
-            QWEN_TEXT_EMBEDDING_SERVICE_NAME,
-            _embed_request
-        )
-        return embeddings[0].embedding
+        return await _EMBEDDING_BATCHER.embed(text)
     except Exception as e:
         logfire.error("Failed to generate embedding: {error}", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Failed to generate embedding: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate embedding: {str(e)}")
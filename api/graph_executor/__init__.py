@@ -1,2 +1,7 @@
 from .graph import GraphMgr, Graph
-from .graph_core import ParamsList, ParamsLineageDict
\ No newline at end of file
+from .graph_core import ParamsList, ParamsLineageDict
+from .memoization import MemoBackend, LRUMemoBackend, RedisMemoBackend
+from .checkpoint import CheckpointStore, MemoryCheckpointStore, RedisCheckpointStore
+from .concurrency import get_graph_deadline, graph_time_remaining
+from .streaming import NodeStream, StreamReturn
+from .profiler import GraphProfiler, GraphProfileReport
\ No newline at end of file
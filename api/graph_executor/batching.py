@@ -0,0 +1,80 @@
+import asyncio
+import inspect
+from collections.abc import Callable
+from typing import Any
+
+
+def has_run_batch(node_def: type) -> bool:
+    """
+    a node opts in batched execution by an async classmethod
+    `run_batch(cls, instances: list[Self], run_params: list[dict[str, Any]]) -> list[Any]`
+    returning the run result of each instance in order.
+    """
+    run_batch = getattr(node_def, "run_batch", None)
+    return run_batch is not None and inspect.iscoroutinefunction(run_batch)
+
+
+class NodeBatcher:
+    """
+    collect the pending instances of a node across the runs of `start_many`
+    and execute them by one `run_batch` call.
+
+    a batch is flushed when every active run is waiting on it, when it reaches
+    `max_batch_size`, or `linger` seconds after its first instance arrived.
+    """
+    def __init__(self,
+                 node_def: type,
+                 active_runs: Callable[[], int],
+                 linger: float = 0.005,
+                 max_batch_size: int | None = None) -> None:
+        self.node_def = node_def
+        self.active_runs = active_runs
+        self.linger = linger
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[Any, dict[str, Any], asyncio.Future]] = []
+        self._linger_handle: asyncio.TimerHandle | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, node_instance: Any, run_params: dict[str, Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((node_instance, run_params, future))
+        if len(self._pending) == 1:
+            self._linger_handle = loop.call_later(self.linger, self._flush)
+        self.maybe_flush()
+        return await future
+
+    def maybe_flush(self) -> None:
+        if not self._pending:
+            return
+        if len(self._pending) >= self.active_runs() or \
+                (self.max_batch_size and len(self._pending) >= self.max_batch_size):
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._linger_handle is not None:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        batch = [p for p in self._pending if not p[2].cancelled()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[Any, dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            results = await self.node_def.run_batch([p[0] for p in batch],
+                                                    [p[1] for p in batch])
+            if len(results) != len(batch):
+                msg = f"{self.node_def.__name__}.run_batch returned {len(results)} results for {len(batch)} instances"
+                raise ValueError(msg)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,154 @@
+import pickle
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any
+
+import logfire
+
+
+@dataclass
+class GraphCheckpoint:
+    """
+    persisted progress of a graph run.
+    the init param pool is rebuilt by merging the deltas in order.
+    """
+    graph_name: str
+    finalized_nodes: dict[str, Any] = field(default_factory=dict)
+    # [{nodename: {param_name: {source_name: param_value}}}, ...]
+    param_pool_deltas: list[dict[str, dict[str, dict[str, Any]]]] = field(default_factory=list)
+
+
+class CheckpointStore(ABC):
+    """
+    storage of graph run checkpoints, written incrementally while nodes are finalized.
+    """
+    @abstractmethod
+    async def begin(self,
+                    run_id: str,
+                    graph_name: str,
+                    seed_delta: dict[str, dict[str, dict[str, Any]]] | None) -> None:
+        """
+        record the graph of the run and the param pool delta of the seed.
+        calling again for a resumed run (seed_delta is None) keeps the recorded seed.
+        """
+
+    @abstractmethod
+    async def save_node(self,
+                        run_id: str,
+                        node: str,
+                        node_instance: Any,
+                        param_pool_delta: dict[str, dict[str, dict[str, Any]]]) -> None:
+        """
+        record a finalized node and the params it pushed to the param pool.
+        """
+
+    @abstractmethod
+    async def load(self, run_id: str) -> GraphCheckpoint | None:
+        pass
+
+    @abstractmethod
+    async def clear(self, run_id: str) -> None:
+        pass
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """
+    in-process checkpoint store, only survives a failed run, not a process restart.
+    """
+    def __init__(self) -> None:
+        self._runs: dict[str, dict[str, bytes]] = {}
+
+    async def begin(self, run_id, graph_name, seed_delta) -> None:
+        run = self._runs.setdefault(run_id, {})
+        run["__graph__"] = graph_name.encode()
+        if seed_delta is not None:
+            run["__seed__"] = pickle.dumps(seed_delta)
+
+    async def save_node(self, run_id, node, node_instance, param_pool_delta) -> None:
+        entry = _dump_node_entry(node, node_instance, param_pool_delta)
+        if entry is not None:
+            self._runs.setdefault(run_id, {})[f"node:{node}"] = entry
+
+    async def load(self, run_id) -> GraphCheckpoint | None:
+        run = self._runs.get(run_id)
+        return _load_checkpoint(run) if run else None
+
+    async def clear(self, run_id) -> None:
+        self._runs.pop(run_id, None)
+
+
+class RedisCheckpointStore(CheckpointStore):
+    """
+    redis checkpoint store, one hash per run expired `ttl` seconds after the last write.
+    """
+    def __init__(self,
+                 client=None,
+                 ttl: int = 86400,
+                 key_prefix: str = "graph_checkpoint:") -> None:
+        if client is None:
+            from api.redis.constants import CLIENT
+            client = CLIENT
+        self.client = client
+        self.ttl = int(ttl)
+        self.key_prefix = key_prefix
+
+    def _key(self, run_id: str) -> str:
+        return f"{self.key_prefix}{run_id}"
+
+    async def begin(self, run_id, graph_name, seed_delta) -> None:
+        mapping: dict[str, bytes | str] = {"__graph__": graph_name}
+        if seed_delta is not None:
+            mapping["__seed__"] = pickle.dumps(seed_delta)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(run_id), mapping=mapping)
+            pipe.expire(self._key(run_id), self.ttl)
+            await pipe.execute()
+
+    async def save_node(self, run_id, node, node_instance, param_pool_delta) -> None:
+        entry = _dump_node_entry(node, node_instance, param_pool_delta)
+        if entry is None:
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(run_id), f"node:{node}", entry)
+            pipe.expire(self._key(run_id), self.ttl)
+            await pipe.execute()
+
+    async def load(self, run_id) -> GraphCheckpoint | None:
+        run = await self.client.hgetall(self._key(run_id))
+        if not run:
+            return None
+        return _load_checkpoint({
+            (k.decode() if isinstance(k, bytes) else k): v
+            for k, v in run.items()
+        })
+
+    async def clear(self, run_id) -> None:
+        await self.client.delete(self._key(run_id))
+
+
+def _dump_node_entry(node: str,
+                     node_instance: Any,
+                     param_pool_delta: dict[str, dict[str, dict[str, Any]]]) -> bytes | None:
+    try:
+        return pickle.dumps((node_instance, param_pool_delta),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        # the node will be executed again when resumed
+        logfire.warning(f"Node {node} can not be pickled, checkpoint skipped: {e}")
+        return None
+
+
+def _load_checkpoint(run: dict[str, bytes]) -> GraphCheckpoint:
+    graph_name = run["__graph__"]
+    checkpoint = GraphCheckpoint(
+        graph_name=graph_name.decode() if isinstance(graph_name, bytes) else graph_name,
+    )
+    if "__seed__" in run:
+        checkpoint.param_pool_deltas.append(pickle.loads(run["__seed__"]))
+    for k, v in run.items():
+        if not k.startswith("node:"):
+            continue
+        node_instance, param_pool_delta = pickle.loads(v)
+        checkpoint.finalized_nodes[k.removeprefix("node:")] = node_instance
+        checkpoint.param_pool_deltas.append(param_pool_delta)
+    return checkpoint
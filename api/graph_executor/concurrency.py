@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator
+
+# absolute deadline of the running graph, in event loop time (loop.time())
+GRAPH_DEADLINE: ContextVar[float | None] = ContextVar("GRAPH_DEADLINE", default=None)
+
+
+def get_graph_deadline() -> float | None:
+    """
+    deadline of the graph the current node belongs to, None if unbounded.
+    """
+    return GRAPH_DEADLINE.get()
+
+
+def graph_time_remaining() -> float | None:
+    """
+    seconds left before the graph deadline, None if unbounded.
+    nodes can use it to bound their own outbound calls.
+    """
+    deadline = GRAPH_DEADLINE.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+
+class NodePools:
+    """
+    named semaphore pools limiting how many nodes of a pool run at once,
+    shared by every run of the graphs of a GraphMgr.
+    a pool without limit does not restrict concurrency.
+    """
+    def __init__(self) -> None:
+        self._limits: dict[str, int] = {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def set_limit(self, pool: str, limit: int | None) -> None:
+        if limit is None:
+            self._limits.pop(pool, None)
+            self._semaphores.pop(pool, None)
+            return
+        if limit < 1:
+            msg = f"Pool {pool} limit must be positive"
+            raise ValueError(msg)
+        self._limits[pool] = limit
+        self._semaphores[pool] = asyncio.Semaphore(limit)
+
+    def get_limit(self, pool: str) -> int | None:
+        return self._limits.get(pool)
+
+    @asynccontextmanager
+    async def acquire(self, pool: str | None) -> AsyncGenerator[None]:
+        semaphore = self._semaphores.get(pool) if pool else None
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            yield
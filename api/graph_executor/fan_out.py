@@ -0,0 +1,52 @@
+import asyncio
+import inspect
+from asyncio.taskgroups import TaskGroup
+from collections.abc import Mapping
+from dataclasses import is_dataclass
+from typing import Any
+
+
+def validate_map_child(node_name: str, child: type) -> None:
+    """
+    a map child is a dataclass built from one item, with an async `run` returning its result.
+    """
+    if not is_dataclass(child):
+        msg = f"Map child {child.__name__} of {node_name} is not a dataclass."
+        raise TypeError(msg)
+    run_method = getattr(child, "run", None)
+    if run_method is None or not inspect.iscoroutinefunction(run_method):
+        msg = f"Map child {child.__name__} of {node_name} must have a coroutine method named 'run'."
+        raise TypeError(msg)
+
+
+async def run_map(node_instance: Any,
+                  map_over: str,
+                  map_to: type,
+                  map_into: str,
+                  map_concurrency: int | None) -> None:
+    """
+    spawn one `map_to` instance per item of the `map_over` field, run them concurrently
+    with at most `map_concurrency` at a time, and store their results in order to the `map_into` field.
+    """
+    from .graph_core import ParamsList
+
+    items = getattr(node_instance, map_over)
+    if items is None:
+        items = []
+    elif isinstance(items, Mapping):
+        # ParamsLineageDict, map over the values from all sources
+        items = list(items.values())
+
+    semaphore = asyncio.Semaphore(map_concurrency) if map_concurrency else None
+
+    async def _run_child(item: Any) -> Any:
+        child = map_to(item)
+        if semaphore is None:
+            return await child.run()
+        async with semaphore:
+            return await child.run()
+
+    async with TaskGroup() as tg:
+        tasks = [tg.create_task(_run_child(item)) for item in items]
+
+    setattr(node_instance, map_into, ParamsList(task.result() for task in tasks))
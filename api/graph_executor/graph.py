@@ -1,22 +1,30 @@
-from collections.abc import Callable
-from typing import Generator, Any, Literal, overload
+from collections.abc import AsyncGenerator, Callable, Iterable
+from typing import Any, Literal, overload
 
-from .graph_core import _Graph
+from .graph_core import NodeOptions, _CompiledGraphPlan, _Graph
+from .checkpoint import CheckpointStore
+from .concurrency import NodePools
+from .offload import NodeExecutors
+from .profiler import GraphProfiler, GraphProfileReport
+from .memoization import MemoBackend
 
 
 class GraphMgr:
     def __init__(self) -> None:
         self._graphs: dict[str, _Graph] = {}
+        self._checkpoint_store: CheckpointStore | None = None
+        self.node_pools = NodePools()
+        self.node_executors = NodeExecutors()
         
-    def __call__(self, name: str) -> Callable:
+    def __call__(self, name: str, **node_options: Any) -> Callable:
         def decorator(cls: type) -> type:
             if name not in self._graphs:
-                self._graphs[name] = _Graph(name)
+                self._graphs[name] = _Graph(name, self.node_pools, self.node_executors)
                 graph = self._graphs[name]
             else:
                 graph = self._graphs[name]
 
-            graph.set_node_def(cls)
+            graph.set_node_def(cls, NodeOptions(**node_options))
             return cls
 
         return decorator
@@ -30,7 +38,11 @@ class GraphMgr:
                     *,
                     yield_return: Literal[True],
                     injected_finalized_nodes,
-                    injected_init_param_pool) -> Generator[tuple[str, dict[str, Any], dict[str, Any]]] :
+                    injected_init_param_pool,
+                    memo_backend,
+                    run_id,
+                    deadline,
+                    profiler) -> AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]] :
         ...
 
     
@@ -42,7 +54,11 @@ class GraphMgr:
                     *,
                     yield_return: Literal[False] = False,
                     injected_finalized_nodes,
-                    injected_init_param_pool) -> tuple[dict[str, Any], dict[str, Any]] :
+                    injected_init_param_pool,
+                    memo_backend,
+                    run_id,
+                    deadline,
+                    profiler) -> tuple[dict[str, Any], dict[str, Any]] :
         ...
 
     async def start(self, 
@@ -52,19 +68,96 @@ class GraphMgr:
                     *,
                     yield_return: bool = False,
                     injected_finalized_nodes = None,
-                    injected_init_param_pool = None) -> tuple[dict[str, Any], dict[str, Any]] :
+                    injected_init_param_pool = None,
+                    memo_backend: MemoBackend | None = None,
+                    run_id: str | None = None,
+                    deadline: float | None = None,
+                    profiler: GraphProfiler | None = None) -> tuple[dict[str, Any], dict[str, Any]] | AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]] :
+        """
+        run_id: checkpoint the run under this id in the store set by `set_checkpoint_store`.
+        deadline: absolute event loop time the run must finish by.
+        profiler: collects node timings, read `profiler.report` after the run.
+        """
         return await self._graphs[name].start(seed,
                                               yield_return=yield_return,
                                               injected_finalized_nodes = injected_finalized_nodes,
-                                              injected_init_param_pool = injected_init_param_pool)
+                                              injected_init_param_pool = injected_init_param_pool,
+                                              memo_backend = memo_backend,
+                                              run_id = run_id,
+                                              checkpoint_store = self._checkpoint_store,
+                                              deadline = deadline,
+                                              profiler = profiler)
+    
+    async def start_many(self,
+                         name: str,
+                         seeds: Iterable[Any],
+                         /,
+                         *,
+                         concurrency: int | None = None,
+                         memo_backend: MemoBackend | None = None,
+                         deadline: float | None = None,
+                         batch_linger: float = 0.005,
+                         max_batch_size: int | None = None,
+                         return_exceptions: bool = False) -> list[tuple[dict[str, Any], dict[str, Any]] | BaseException]:
+        """
+        run the graph over many seeds with one compiled plan, nodes with `run_batch` are executed in batches.
+        """
+        return await self._graphs[name].start_many(seeds,
+                                                   concurrency=concurrency,
+                                                   memo_backend=memo_backend,
+                                                   deadline=deadline,
+                                                   batch_linger=batch_linger,
+                                                   max_batch_size=max_batch_size,
+                                                   return_exceptions=return_exceptions)
+    
+    async def resume(self,
+                     run_id: str,
+                     /,
+                     *,
+                     yield_return: bool = False,
+                     memo_backend: MemoBackend | None = None,
+                     deadline: float | None = None,
+                     profiler: GraphProfiler | None = None) -> tuple[dict[str, Any], dict[str, Any]] | AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]] :
+        """
+        resume a checkpointed run, only the unfinished frontier is executed.
+        """
+        if self._checkpoint_store is None:
+            msg = "Checkpoint store is not set"
+            raise ValueError(msg)
+        checkpoint = await self._checkpoint_store.load(run_id)
+        if checkpoint is None:
+            msg = f"No checkpoint found for run {run_id}"
+            raise ValueError(msg)
+        return await self._graphs[checkpoint.graph_name].resume(run_id,
+                                                                checkpoint,
+                                                                self._checkpoint_store,
+                                                                yield_return=yield_return,
+                                                                memo_backend=memo_backend,
+                                                                deadline=deadline,
+                                                                profiler=profiler)
+    
+    def set_checkpoint_store(self, store: CheckpointStore | None) -> None:
+        self._checkpoint_store = store
+    
+    def set_pool_limit(self, pool: str, limit: int | None) -> None:
+        """
+        limit concurrent runs of nodes declared with @Graph(name, pool=pool), None to remove the limit.
+        """
+        self.node_pools.set_limit(pool, limit)
     
 
+    def compile(self, name: str) -> _CompiledGraphPlan:
+        """
+        compile the graph ahead of the first run, the plan is reused until a node is registered.
+        """
+        return self._graphs[name].plan
     
     def render_as_mermaid(self,
                           name: str,
                           save_to: str | None = None,
-                          ink_service_base_url: str | None = None):
-        return self._graphs[name].render_as_mermaid(save_to, ink_service_base_url)
+                          ink_service_base_url: str | None = None,
+                          profile: GraphProfileReport | None = None):
+        return self._graphs[name].render_as_mermaid(save_to, ink_service_base_url, profile)
 
 
 Graph = GraphMgr()
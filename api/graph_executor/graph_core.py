@@ -1,16 +1,27 @@
+import asyncio
+import contextlib
+import contextvars
 import graphlib
 import inspect
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Mapping
 from concurrent.futures import Future, ThreadPoolExecutor
-from copy import deepcopy
-from dataclasses import Field, is_dataclass
+from dataclasses import dataclass, is_dataclass
 from threading import Lock
-from types import NoneType, UnionType
-from typing import Any, ForwardRef, Optional, Union, get_args, get_origin, overload, Literal, Iterable
+from types import MappingProxyType, NoneType, UnionType
+from typing import Any, AsyncGenerator, ForwardRef, Optional, Union, get_args, get_origin, overload, Literal, Iterable
 
 from asyncio.taskgroups import TaskGroup
 from asyncio.queues import Queue
 from .exceptions import MissingRunMethodError, UnExpectedNodeError
+from .concurrency import GRAPH_DEADLINE, NodePools
+from .offload import NodeExecutors
+from .fan_out import run_map, validate_map_child
+from .batching import NodeBatcher, has_run_batch
+from .streaming import NodeStream, StreamReturn
+from .profiler import GraphProfiler, GraphProfileReport
+from .checkpoint import CheckpointStore, GraphCheckpoint
+from .memoization import MemoBackend, dump_memo_entry, load_memo_entry, make_memo_key
 
 import logfire
 from pathlib import Path
@@ -31,12 +42,140 @@ class BypassSignal:
         else:
             raise TypeError("node must be a string or a type")
 
+@dataclass(frozen=True)
+class NodeOptions:
+    """
+    execution options of a node, declared by keyword arguments of the graph decorator.
+    e.g. @Graph("json_extract", memoize=True)
+    """
+    # reuse the result of a previous run with the same inputs when a memo backend is given to start
+    memoize: bool = False
+    # name of the semaphore pool bounding concurrent runs, see GraphMgr.set_pool_limit
+    pool: str | None = None
+    # seconds allowed for run, bounded by the graph deadline as well
+    timeout: float | None = None
+    # where a `compute` node runs, see NodeExecutors
+    executor: Literal["process", "thread"] = "process"
+    # map node: before run, one `map_to` instance is built per item of the `map_over` field
+    # and run concurrently (at most `map_concurrency` at a time), their results are stored
+    # in order to the `map_into` field, so run can hand them to a reducer node.
+    map_over: str | None = None
+    map_to: type | None = None
+    map_into: str = "results"
+    map_concurrency: int | None = None
+
+
+FieldBinder = Callable[[str, str, ParamsLineageDict], Any]
+
+def _bind_lineage(node: str, p_name: str, p_values: ParamsLineageDict) -> Any:
+    return p_values
+
+def _bind_list(node: str, p_name: str, p_values: ParamsLineageDict) -> Any:
+    return ParamsList(p_values.values())
+
+def _make_single_binder(annotation: Any) -> FieldBinder:
+    def _bind_single(node: str, p_name: str, p_values: ParamsLineageDict) -> Any:
+        if len(p_values) > 1:
+            raise ValueError(f"{node} field {p_name} anotated as {annotation} can only have one value source")
+        return next(iter(p_values.values()))
+    return _bind_single
+
+def _make_not_optional_binder() -> FieldBinder:
+    def _bind_not_optional(node: str, p_name: str, p_values: ParamsLineageDict) -> Any:
+        raise ValueError(f"node param {p_name} is not optional in node {node} definition")
+    return _bind_not_optional
+
+def _resolve_field_binder(field_type: Any) -> FieldBinder:
+    """
+    resolve how values from the param pool are bound to a dataclass field,
+    so the type annotation is only inspected once per node definition.
+    """
+    annotation = field_type
+    if ((get_origin(field_type) is Optional) or\
+                (get_origin(field_type) is Union) or \
+                (get_origin(field_type) is UnionType)):
+        if NoneType not in get_args(field_type):
+            return _make_not_optional_binder()
+        for _t in get_args(field_type):
+            if _t is not NoneType:
+                field_type = _t
+                break
+    container = get_origin(field_type) or field_type
+    if container is ParamsLineageDict:
+        return _bind_lineage
+    if container is ParamsList:
+        return _bind_list
+    return _make_single_binder(annotation)
+
+
+@dataclass(frozen=True)
+class _CompiledGraphPlan:
+    """
+    immutable execution plan of a graph, compiled once from the node definitions
+    and shared by every run until the graph definition changes.
+    """
+    # {node_name: predecessors}, merged from connections and pulls, feed to TopologicalSorter
+    predecessor_graph: Mapping[str, frozenset[str]]
+    # {node_name: predecessors}, only from connections, used to decide bypass
+    connection_predecessors: Mapping[str, frozenset[str]]
+    # {node_name: successors}, only from connections, used to propagate bypass
+    connection_successors: Mapping[str, frozenset[str]]
+    # {node_name: {param_name: node_name}}
+    pull_sources: Mapping[str, Mapping[str, str]]
+    # {node_name: {field_name: binder}}
+    field_binders: Mapping[str, Mapping[str, FieldBinder]]
+    # {node_name: options}
+    node_options: Mapping[str, NodeOptions]
+    # {node_name: "run" | "compute"}
+    node_entry: Mapping[str, str]
+    # nodes executed by `run_batch` when the graph is started by `start_many`
+    batch_nodes: frozenset[str]
+    # nodes whose run is an async generator streaming partial outputs
+    streaming_nodes: frozenset[str]
+    # {node_name: {param_name: streaming node_name}}
+    stream_sources: Mapping[str, Mapping[str, str]]
+
+    def new_sorter(self) -> graphlib.TopologicalSorter:
+        topo_graph = graphlib.TopologicalSorter(self.predecessor_graph)
+        topo_graph.prepare()
+        return topo_graph
+
+
 class _Graph:
-    def __init__(self, name: str) -> None:
+    def __init__(self,
+                 name: str,
+                 node_pools: NodePools | None = None,
+                 node_executors: NodeExecutors | None = None) -> None:
         self.name: str = name
+        self.node_pools: NodePools = node_pools if node_pools else NodePools()
+        self.node_executors: NodeExecutors = node_executors if node_executors else NodeExecutors()
         self.node_def: dict[str, type] = {}
         self.node_successor: dict[str, set[str]] = {}
         self.node_pull_sources: dict[str, dict[str, str]] = {} # {node_name: {param_name: node_name}}
+        self.node_options: dict[str, NodeOptions] = {}
+        self.node_entry: dict[str, str] = {} # {node_name: "run" | "compute"}
+        self.node_stream_sources: dict[str, dict[str, str]] = {} # {node_name: {param_name: streaming node_name}}
+        self._plan: _CompiledGraphPlan | None = None
+        
+    @staticmethod
+    def _get_entry_method(node: type) -> tuple[str, Callable]:
+        """
+        the method executed for the node, an async `run`, or a sync `compute` offloaded to a pool.
+        """
+        class_name = node.__name__
+        members = dict(
+            member for member in inspect.getmembers(node)
+            if member[0] in ("run", "compute") and inspect.isfunction(member[1])
+        )
+        if "run" in members and "compute" in members:
+            msg = f"Class {class_name} can not have both 'run' and 'compute' methods."
+            raise TypeError(msg)
+        if "compute" in members:
+            return "compute", members["compute"]
+        if "run" in members:
+            return "run", members["run"]
+        msg = f"Class {class_name} does not have a method named 'run'."
+        raise MissingRunMethodError(msg)
         
     def _validate_node_def(self, node: type) -> None:
         # check node is a dataclass
@@ -45,17 +184,16 @@ class _Graph:
             raise TypeError(msg)
         
         class_name = node.__name__
-        members = inspect.getmembers(node)
-        # check there is run method in the class
-        if not any(member[0] == "run" and inspect.isfunction(member[1]) for member in members):
-            msg = f"Class {class_name} does not have a method named 'run'."
-            raise MissingRunMethodError(msg)
-        _run_method = next(member[1] for member in members if member[0] == "run" and inspect.isfunction(member[1]))
-        _run_annotation = _run_method.__annotations__
-        # check run method is async function
-        if not inspect.iscoroutinefunction(_run_method):
+        # check there is run or compute method in the class
+        _entry_name, _run_method = self._get_entry_method(node)
+        # check run method is async function, compute method is sync function
+        # an async generator run streams its partial outputs
+        if _entry_name == "run" and not (inspect.iscoroutinefunction(_run_method) or inspect.isasyncgenfunction(_run_method)):
             msg = f"Method 'run' in class {class_name} is not a coroutine function."
             raise TypeError(msg)
+        if _entry_name == "compute" and (inspect.iscoroutinefunction(_run_method) or inspect.isasyncgenfunction(_run_method)):
+            msg = f"Method 'compute' in class {class_name} must be a plain function."
+            raise TypeError(msg)
         # check all the parameters has annotations
         _run_signature = inspect.signature(_run_method)
         for param_name, param in _run_signature.parameters.items():
@@ -65,9 +203,24 @@ class _Graph:
                 continue
             if param.annotation == inspect.Parameter.empty:
                 hint = "All parameters must have annotations."
-                msg = f"The parameter '{param_name}' in method 'run' in class {class_name} does not have an annotation."
+                msg = f"The parameter '{param_name}' in method '{_entry_name}' in class {class_name} does not have an annotation."
                 raise TypeError(hint, msg)
 
+    def _validate_map_options(self, node: type, entry_name: str, options: NodeOptions) -> None:
+        class_name = node.__name__
+        if entry_name != "run":
+            msg = f"Map node {class_name} must define 'run' instead of 'compute'."
+            raise TypeError(msg)
+        if options.map_to is None:
+            msg = f"Map node {class_name} does not declare map_to."
+            raise ValueError(msg)
+        node_fields = node.__dataclass_fields__
+        for field_name in (options.map_over, options.map_into):
+            if field_name not in node_fields:
+                msg = f"Map node {class_name} does not have a field named '{field_name}'."
+                raise ValueError(msg)
+        validate_map_child(class_name, options.map_to)
+
     def _register_node_successor(self, cls_name, run_method) -> None:
         # get the parameters and annotations of the run method
         _run_annotation = run_method.__annotations__
@@ -104,6 +257,7 @@ class _Graph:
         _run_annotation = run_method.__annotations__
         _run_signature = inspect.signature(run_method)
         node_pull_sources = {}
+        node_stream_sources = {}
         for param_name, param in _run_signature.parameters.items():
             if param_name in ("self", "cls"):
                 continue
@@ -111,7 +265,13 @@ class _Graph:
                 continue
             param_annotation = _run_annotation.get(param_name, None)
             if param_annotation:
-                if isinstance(param_annotation, (ForwardRef, str)):
+                if get_origin(param_annotation) is NodeStream:
+                    # NodeStream["Producer"] does not wait for the producer to finish
+                    source = get_args(param_annotation)[0]
+                    if isinstance(source, ForwardRef):
+                        source = source.__forward_arg__
+                    node_stream_sources[param_name] = source if isinstance(source, str) else source.__name__
+                elif isinstance(param_annotation, (ForwardRef, str)):
                     node_pull_sources[param_name] = param_annotation
                 else:
                     node_pull_sources[param_name] = param_annotation.__name__
@@ -119,8 +279,9 @@ class _Graph:
                 msg = f"The parameter '{param_name}' in method 'run' in class {cls_name} does not have an annotation."
                 raise TypeError(msg)
         self.node_pull_sources[cls_name] = node_pull_sources
+        self.node_stream_sources[cls_name] = node_stream_sources
 
-    def set_node_def(self, node: type) -> None:
+    def set_node_def(self, node: type, options: NodeOptions | None = None) -> None:
         if node.__name__ in self.node_def:
             msg = f"Node {node.__name__} is already registered"
             raise ValueError(msg)
@@ -128,10 +289,18 @@ class _Graph:
         self._validate_node_def(node)
         
         class_name = node.__name__
-        members = inspect.getmembers(node)
-        _run_method = next(member[1] for member in members if member[0] == "run" and inspect.isfunction(member[1]))
+        _entry_name, _run_method = self._get_entry_method(node)
+        if options and options.map_over:
+            self._validate_map_options(node, _entry_name, options)
+        if options and options.memoize and inspect.isasyncgenfunction(_run_method):
+            msg = f"Streaming node {class_name} can not be memoized, its partial outputs would not be replayed."
+            raise ValueError(msg)
 
         self.node_def[class_name] = node
+        self.node_entry[class_name] = _entry_name
+        self.node_options[class_name] = options if options else NodeOptions()
+        # the node set changed, the compiled plan must be rebuilt
+        self._plan = None
         
         self._register_node_successor(class_name, _run_method)
             
@@ -174,7 +343,7 @@ class _Graph:
                     successor_graph_from_dep[dep] = set()
                 successor_graph_from_dep[dep].add(node)
                 
-        merged_successor_graph = deepcopy(self.node_successor)
+        merged_successor_graph = { k: set(v) for k, v in self.node_successor.items() }
         for node, successor in successor_graph_from_dep.items():
             if node not in merged_successor_graph:
                 merged_successor_graph[node] = set()
@@ -186,9 +355,74 @@ class _Graph:
             for successor in successors:
                 if successor not in predecessor_graph_from_successor:
                     predecessor_graph_from_successor[successor] = set()
-                predecessor_graph_from_successor[successor].update(node)
+                predecessor_graph_from_successor[successor].add(node)
             
         return predecessor_graph_from_successor
+
+    def compile(self) -> _CompiledGraphPlan:
+        """
+        validate the graph and build the immutable execution plan.
+        """
+        predecessor_graph = self._validate_graph_node_def()
+        try:
+            graphlib.TopologicalSorter(predecessor_graph).prepare()
+        except graphlib.CycleError as e:
+            msg = f"The graph is not a DAG, there is a cycle in the graph: {e}"
+            raise ValueError(msg)
+
+        connection_predecessors: dict[str, set[str]] = { node: set() for node in self.node_def }
+        for node, successors in self.node_successor.items():
+            for successor in successors:
+                connection_predecessors[successor].add(node)
+
+        streaming_nodes = frozenset(
+            node for node, node_def in self.node_def.items()
+            if inspect.isasyncgenfunction(getattr(node_def, "run", None))
+        )
+        for node, sources in self.node_stream_sources.items():
+            for source in sources.values():
+                if source not in streaming_nodes:
+                    msg = f"{node} accepts stream of {source}, which is not a registered streaming node"
+                    raise ValueError(msg)
+                if source in connection_predecessors[node]:
+                    msg = f"{node} accepts stream of {source}, so it can not be a successor of {source} as well"
+                    raise ValueError(msg)
+            if sources:
+                # the consumer is scheduled without waiting for its producers
+                predecessor_graph.setdefault(node, set())
+
+        field_binders = {
+            node: MappingProxyType({
+                f_name: _resolve_field_binder(f.type)
+                for f_name, f in node_def.__dataclass_fields__.items()
+            })
+            for node, node_def in self.node_def.items()
+        }
+
+        return _CompiledGraphPlan(
+            predecessor_graph=MappingProxyType({ k: frozenset(v) for k, v in predecessor_graph.items() }),
+            connection_predecessors=MappingProxyType({ k: frozenset(v) for k, v in connection_predecessors.items() }),
+            connection_successors=MappingProxyType({ k: frozenset(v) for k, v in self.node_successor.items() }),
+            pull_sources=MappingProxyType({ k: MappingProxyType(dict(v)) for k, v in self.node_pull_sources.items() }),
+            field_binders=MappingProxyType(field_binders),
+            node_options=MappingProxyType(dict(self.node_options)),
+            node_entry=MappingProxyType(dict(self.node_entry)),
+            batch_nodes=frozenset(
+                node for node, node_def in self.node_def.items()
+                if self.node_entry[node] == "run" and has_run_batch(node_def) and node not in streaming_nodes
+            ),
+            streaming_nodes=streaming_nodes,
+            stream_sources=MappingProxyType({ k: MappingProxyType(dict(v)) for k, v in self.node_stream_sources.items() if v }),
+        )
+
+    @property
+    def plan(self) -> _CompiledGraphPlan:
+        """
+        compiled plan of the graph, built on first access after the graph definition changed.
+        """
+        if self._plan is None:
+            self._plan = self.compile()
+        return self._plan
                 
     def _update_to_param_pool(self,
                               param_poll: dict[str | type, dict[str, Any]],
@@ -243,63 +477,189 @@ class _Graph:
               *,
               yield_return: bool = False,
               injected_finalized_nodes = None,
-              injected_init_param_pool = None) -> tuple[dict[str, Any], dict[str, Any]]:
+              injected_init_param_pool = None,
+              memo_backend: MemoBackend | None = None,
+              run_id: str | None = None,
+              checkpoint_store: CheckpointStore | None = None,
+              deadline: float | None = None,
+              profiler: GraphProfiler | None = None) -> tuple[dict[str, Any], dict[str, Any]] | AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]]:
         """_summary_
-        will execute the graph by theardpoll.
+        will execute the graph on the running event loop.
         
         Returns:
             tuple[dict[str, Any], dict[str, Any]]: finalized_nodes_dict, init_param_pool
+            or an async generator yield (node, finalized_nodes_dict, init_param_pool)
+            after each node finalized, if yield_return is True.
+            
+        Args:
+            memo_backend: when given, nodes declared with memoize=True skip run
+                if the same init params and pull sources were seen before,
+                and replay the memoized return value instead.
+            run_id, checkpoint_store: when both given, each finalized node and
+                the params it pushed are written to the store, so the run can be
+                resumed by `resume` after a crash. The checkpoint is cleared when
+                the run completes.
+            deadline: absolute event loop time (loop.time()) the whole run must
+                finish by. Pool waits and node runs are cancelled with TimeoutError
+                once it passes; nodes can read it by `get_graph_deadline`.
+            profiler: records the timings of each node, its `report` holds the
+                critical path of the run once it ends, also set on the graph span.
         """
-        
-        _graph = self._validate_graph_node_def()
-        try:
-            topo_graph = graphlib.TopologicalSorter(_graph)
-            topo_graph.prepare()
-        except graphlib.CycleError as e:
-            msg = f"The graph is not a DAG, there is a cycle in the graph: {e}"
-            raise ValueError(msg)
+        plan = self.plan
         
         # {nodename: {param_name: {source_name: param_value}}}
         _init_param_pool : dict[str, dict[str, dict[str, Any]]] = injected_init_param_pool if injected_init_param_pool else {}
-        _init_param_pool_lock = Lock()
-        
         _finalized_nodes_dict = injected_finalized_nodes if injected_finalized_nodes else {}
+        
+        if run_id is None:
+            checkpoint_store = None
+        runner = self._execute(plan,
+                               seed,
+                               _finalized_nodes_dict,
+                               _init_param_pool,
+                               memo_backend,
+                               run_id,
+                               checkpoint_store,
+                               deadline,
+                               profiler=profiler)
+        if yield_return:
+            return runner
+        
+        async for _ in runner:
+            pass
+        return _finalized_nodes_dict, _init_param_pool
+    
+    @staticmethod
+    def _merge_param_pool(param_poll: dict[str, dict[str, Any]],
+                          delta: dict[str, dict[str, dict[str, Any]]]) -> None:
+        for name, params in delta.items():
+            exist_data = param_poll.setdefault(name, {})
+            for k, v in params.items():
+                exist_data.setdefault(k, ParamsLineageDict()).update(v)
+    
+    async def resume(self,
+                     run_id: str,
+                     checkpoint: GraphCheckpoint,
+                     checkpoint_store: CheckpointStore,
+                     /,
+                     *,
+                     yield_return: bool = False,
+                     memo_backend: MemoBackend | None = None,
+                     deadline: float | None = None,
+                     profiler: GraphProfiler | None = None) -> tuple[dict[str, Any], dict[str, Any]] | AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]]:
+        """
+        restart a checkpointed run, only the nodes not finalized yet are executed.
+        """
+        _init_param_pool: dict[str, dict[str, dict[str, Any]]] = {}
+        for delta in checkpoint.param_pool_deltas:
+            self._merge_param_pool(_init_param_pool, delta)
+        
+        return await self.start(yield_return=yield_return,
+                                injected_finalized_nodes=dict(checkpoint.finalized_nodes),
+                                injected_init_param_pool=_init_param_pool,
+                                memo_backend=memo_backend,
+                                run_id=run_id,
+                                checkpoint_store=checkpoint_store,
+                                deadline=deadline,
+                                profiler=profiler)
+    
+    async def start_many(self,
+                         seeds: Iterable[Any],
+                         /,
+                         *,
+                         concurrency: int | None = None,
+                         memo_backend: MemoBackend | None = None,
+                         deadline: float | None = None,
+                         batch_linger: float = 0.005,
+                         max_batch_size: int | None = None,
+                         return_exceptions: bool = False) -> list[tuple[dict[str, Any], dict[str, Any]] | BaseException]:
+        """
+        run the graph once per seed, at most `concurrency` runs at a time, sharing the compiled plan.
+        
+        nodes defining an async classmethod `run_batch` are not run one by one, their pending
+        instances across the runs are collected and executed by one `run_batch` call, see NodeBatcher.
+        
+        Returns:
+            list of (finalized_nodes_dict, init_param_pool) in the order of seeds,
+            exceptions are returned in place if return_exceptions is True.
+        """
+        plan = self.plan
+        seeds = list(seeds)
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        active_runs = 0
+        batchers = {
+            node: NodeBatcher(self.node_def[node],
+                              lambda: active_runs,
+                              linger=batch_linger,
+                              max_batch_size=max_batch_size)
+            for node in plan.batch_nodes
+        }
+        
+        async def _run_one(seed: Any) -> tuple[dict[str, Any], dict[str, Any]]:
+            nonlocal active_runs
+            _init_param_pool: dict[str, dict[str, dict[str, Any]]] = {}
+            _finalized_nodes_dict: dict[str, Any] = {}
+            async with semaphore if semaphore else contextlib.nullcontext():
+                active_runs += 1
+                try:
+                    async for _ in self._execute(plan,
+                                                 seed,
+                                                 _finalized_nodes_dict,
+                                                 _init_param_pool,
+                                                 memo_backend,
+                                                 deadline=deadline,
+                                                 batchers=batchers):
+                        pass
+                finally:
+                    active_runs -= 1
+                    # the finished run may be the last one the pending batches wait for
+                    for batcher in batchers.values():
+                        batcher.maybe_flush()
+            return _finalized_nodes_dict, _init_param_pool
+        
+        with logfire.span(f"Graph {self.name} x {len(seeds)}"):
+            return await asyncio.gather(*[_run_one(seed) for seed in seeds],
+                                        return_exceptions=return_exceptions)
+    
+    async def _execute(self,
+                       plan: _CompiledGraphPlan,
+                       seed: Any | None,
+                       _finalized_nodes_dict: dict[str, Any],
+                       _init_param_pool: dict[str, dict[str, dict[str, Any]]],
+                       memo_backend: MemoBackend | None = None,
+                       run_id: str | None = None,
+                       checkpoint_store: CheckpointStore | None = None,
+                       deadline: float | None = None,
+                       batchers: dict[str, NodeBatcher] | None = None,
+                       profiler: GraphProfiler | None = None) -> AsyncGenerator[tuple[str, dict[str, Any], dict[str, Any]]]:
+        topo_graph = plan.new_sorter()
+        
+        # node tasks run in a context carrying the graph deadline
+        _node_context = contextvars.copy_context()
+        _node_context.run(GRAPH_DEADLINE.set, deadline)
+        
+        # {nodename: param pool delta pushed by the node}, waiting to be checkpointed
+        _param_pool_deltas: dict[str, dict[str, dict[str, dict[str, Any]]]] = {}
+        
+        # {nodename: stream}, partial outputs of the streaming nodes in this run
+        _streams: dict[str, NodeStream] = { node: NodeStream(node) for node in plan.streaming_nodes }
+        
+        _init_param_pool_lock = Lock()
         _finalized_nodes_dict_lock = Lock()
         _finalized_nodes_queue = Queue()
         
         
         def _processe_node_params(node: str, 
-                                 node_feilds: dict[str, Field[Any]],
                                  node_params: dict[str, dict[str, dict[str, Any]]]):
+            node_binders = plan.field_binders[node]
             processed_node_params = {}
             for p_name, p_values in node_params.items():
                 if p_name == "__bypass__":
                     continue
-                if p_name not in node_feilds:
+                binder = node_binders.get(p_name)
+                if binder is None:
                     raise ValueError(f"node param {p_name} not found in node {node} definition")
-                field_type = node_feilds[p_name].type
-                if ((get_origin(field_type) is Optional) or\
-                            (get_origin(field_type) is Union) or \
-                            (get_origin(field_type) is UnionType)):
-                    if NoneType not in get_args(field_type):
-                        raise ValueError(f"node param {p_name} is not optional in node {node} definition")
-                    if ParamsLineageDict in get_args(field_type):
-                        field_type = ParamsLineageDict
-                    elif ParamsList in get_args(field_type):
-                        field_type = ParamsList
-                    else:
-                        for _t in get_args(field_type):
-                            if _t is not NoneType:
-                                field_type = _t
-                                break
-                if get_origin(field_type) is ParamsLineageDict:
-                    processed_node_params[p_name] = p_values
-                elif get_origin(field_type) is ParamsList:
-                    processed_node_params[p_name] = ParamsList(p_values.values())
-                else:
-                    if len(p_values) > 1:
-                        raise ValueError(f"{node} field {p_name} anotated as {node_feilds[p_name].type} can only have one value source")
-                    processed_node_params[p_name] = next(iter(p_values.values()))
+                processed_node_params[p_name] = binder(node, p_name, p_values)
             return processed_node_params
         
         def _should_be_bypassed(node: str, 
@@ -307,41 +667,35 @@ class _Graph:
             bypass_signal = node_params.get("__bypass__", None)
             if not bypass_signal:
                 return False
-            # get all predecessors
-            predecessors = [
-                pred
-                for pred, ss in self.node_successor.items() if node in ss
-            ]
-            bypass_source = list(bypass_signal.keys())
-            return all(pred in bypass_source for pred in predecessors)
+            return plan.connection_predecessors[node].issubset(bypass_signal.keys())
                 
         async def _node_execute_task(node: str) -> None:
             try:
                 node_def = self.node_def[node]
-                assert is_dataclass(node_def), f"node_def {node_def} is not a dataclass"
-                node_feilds = node_def.__dataclass_fields__
                 
                 # create node instance
+                param_started_at = time.perf_counter()
                 with _init_param_pool_lock:
                     node_params = _init_param_pool.get(node, {})
                     # check is the node should be bypassed
                     should_bypass = _should_be_bypassed(node, node_params)
                     # process node params by node_def fields type annotation
                     if not should_bypass:
-                        processed_node_params = _processe_node_params(node, node_feilds, node_params)
+                        processed_node_params = _processe_node_params(node, node_params)
+                if profiler is not None:
+                    profiler.add_param_time(node, time.perf_counter() - param_started_at)
                 
                 if should_bypass:
+                    if profiler is not None:
+                        profiler.node_bypassed(node)
                     # throw bypass signal to all downstream nodes
                     node_instance = None
+                    run_result = tuple([
+                        BypassSignal(ss)
+                        for ss in plan.connection_successors[node]
+                    ])
                     with _init_param_pool_lock:
-                        self._update_to_param_pool(
-                            _init_param_pool,
-                            node,
-                            tuple([
-                                BypassSignal(ss)
-                                for ss in self.node_successor[node]
-                            ]),
-                        )
+                        self._update_to_param_pool(_init_param_pool, node, run_result)
                     with _finalized_nodes_dict_lock:
                         _finalized_nodes_dict[node] = node_instance
                         
@@ -351,10 +705,58 @@ class _Graph:
                     
                     # coleecte run pull sources
                     with _finalized_nodes_dict_lock:
-                        run_params = { k: _finalized_nodes_dict.get(v) for k, v in self.node_pull_sources[node].items() }
+                        run_params = { k: _finalized_nodes_dict.get(v) for k, v in plan.pull_sources[node].items() }
+                    for k, v in plan.stream_sources.get(node, {}).items():
+                        run_params[k] = _streams[v]
                     
-                    # invoke run method
-                    run_result = await node_instance.run(**run_params)
+                    memo_key = None
+                    memo_entry = None
+                    if memo_backend is not None and plan.node_options[node].memoize:
+                        memo_key = make_memo_key(self.name, node, processed_node_params, run_params)
+                        if memo_key is not None:
+                            memo_entry = await memo_backend.get(memo_key)
+                    
+                    if memo_entry is not None:
+                        if profiler is not None:
+                            profiler.node_run_started(node)
+                        # replay memoized run
+                        run_result = load_memo_entry(node_instance, memo_entry)
+                        logfire.info(f"Node {node} is replayed from memo")
+                    else:
+                        # invoke run method inside its pool and time limits
+                        options = plan.node_options[node]
+                        async with asyncio.timeout_at(deadline):
+                            async with self.node_pools.acquire(options.pool):
+                                async with asyncio.timeout(options.timeout):
+                                    if profiler is not None:
+                                        profiler.node_run_started(node)
+                                    if options.map_over:
+                                        # fan out before any kind of run, plain, streaming or batched
+                                        await run_map(node_instance,
+                                                      options.map_over,
+                                                      options.map_to,
+                                                      options.map_into,
+                                                      options.map_concurrency)
+                                    if batchers and node in batchers:
+                                        run_result = await batchers[node].submit(node_instance, run_params)
+                                    elif plan.node_entry[node] == "compute":
+                                        run_result = await self.node_executors.compute(options.executor,
+                                                                                       node_instance,
+                                                                                       run_params)
+                                    elif node in _streams:
+                                        # push partial outputs to consumers until the return value is yielded
+                                        run_result = None
+                                        async for chunk in node_instance.run(**run_params):
+                                            if isinstance(chunk, StreamReturn):
+                                                run_result = chunk.value
+                                            else:
+                                                _streams[node].push(chunk)
+                                    else:
+                                        run_result = await node_instance.run(**run_params)
+                        if memo_key is not None:
+                            memo_entry = dump_memo_entry(node_instance, run_result)
+                            if memo_entry is not None:
+                                await memo_backend.set(memo_key, memo_entry)
                     
                     with _init_param_pool_lock:
                         if run_result is not None:
@@ -364,16 +766,38 @@ class _Graph:
                     with _finalized_nodes_dict_lock:
                         _finalized_nodes_dict[node] = node_instance
                 
-            except Exception:
+                if checkpoint_store is not None:
+                    delta = {}
+                    if run_result is not None:
+                        self._update_to_param_pool(delta, node, run_result)
+                    _param_pool_deltas[node] = delta
+                
+            except Exception as e:
+                if node in _streams:
+                    _streams[node].close(e)
                 raise
             finally:
+                if node in _streams:
+                    _streams[node].close()
+                if profiler is not None:
+                    profiler.node_finished(node)
                 await _finalized_nodes_queue.put(node)
                                        
         tg = TaskGroup()
-        with logfire.span(f"Graph {self.name}"):
+        node = None
+        with logfire.span(f"Graph {self.name}") as graph_span:
+            if profiler is not None:
+                profiler.run_started(self.name)
             if seed:
                 self._update_to_param_pool(_init_param_pool, "__start__", seed)
             
+            if checkpoint_store is not None:
+                seed_delta = None
+                if seed:
+                    seed_delta = {}
+                    self._update_to_param_pool(seed_delta, "__start__", seed)
+                await checkpoint_store.begin(run_id, self.name, seed_delta)
+            
             try:
                 async with tg:
                     active_nodes = set()
@@ -382,31 +806,48 @@ class _Graph:
                         for node in topo_graph.get_ready():
                             with logfire.span(f"Graph {self.name}::{node}"):
                                 if node in _finalized_nodes_dict:
+                                    if node in _streams:
+                                        _streams[node].close()
                                     topo_graph.done(node)
                                     logfire.info(f"Node {node} is already finalized")
                                 else:
-                                    tg.create_task(_node_execute_task(node))
+                                    if profiler is not None:
+                                        profiler.node_ready(node)
+                                    tg.create_task(_node_execute_task(node), context=_node_context.copy())
                                     active_nodes.add(node)
                         
                         if active_nodes:
                             node = await _finalized_nodes_queue.get()
+                            if checkpoint_store is not None and node in _param_pool_deltas:
+                                await checkpoint_store.save_node(run_id,
+                                                                 node,
+                                                                 _finalized_nodes_dict[node],
+                                                                 _param_pool_deltas.pop(node))
                             topo_graph.done(node)
                             active_nodes.remove(node)
-                        if yield_return:
                             yield node, _finalized_nodes_dict, _init_param_pool
             # catch exception from task group
             except Exception as e:
                 raise UnExpectedNodeError(f"during run {node}",
                                         _init_param_pool,
                                         _finalized_nodes_dict) from e
-                
-        return _finalized_nodes_dict, _init_param_pool
+            finally:
+                if profiler is not None:
+                    report = profiler.run_finished(plan.predecessor_graph)
+                    graph_span.set_attribute("critical_path", report.critical_path)
+                    graph_span.set_attribute("critical_path_run_time", report.critical_path_run_time)
+                    graph_span.set_attribute("profile", report.to_dict())
+            
+            if checkpoint_store is not None:
+                await checkpoint_store.clear(run_id)
         
     def render_as_mermaid(self,
                           save_to: Path | None = None,
-                          ink_service_base_url: str | None = None) -> str:
+                          ink_service_base_url: str | None = None,
+                          profile: GraphProfileReport | None = None) -> str:
         """
-        render graph as mermaid
+        render graph as mermaid,
+        nodes are annotated with their durations and the critical path is highlighted if profile is given.
         """
         # merge dependency and successor graph
         successor_graph_from_dep:  dict[str, set[str]] = {}
@@ -423,6 +864,16 @@ class _Graph:
         #     merged_successor_graph[node].update(successor)
         
         mm_str = "graph LR;\n"
+        if profile:
+            for node, timing in profile.nodes.items():
+                if timing.bypassed:
+                    label = f"{node}<br/>bypassed"
+                else:
+                    label = f"{node}<br/>run {timing.run_time * 1000:.1f}ms<br/>wait {timing.queue_wait * 1000:.1f}ms"
+                mm_str += f'\t{node}["{label}"]\n'
+            if profile.critical_path:
+                mm_str += "\tclassDef critical stroke:#d33,stroke-width:3px;\n"
+                mm_str += f"\tclass {','.join(profile.critical_path)} critical;\n"
         for node, successor in self.node_successor.items():
             if not successor:
                 continue
@@ -439,6 +890,11 @@ class _Graph:
             mm_str += " & ".join([f"{s}" for s in successor])
             mm_str += "\n"
         
+        for node, sources in self.node_stream_sources.items():
+            for source in set(sources.values()):
+                mm_str += "\t"
+                mm_str += f"{source} -. stream .-> {node}"
+                mm_str += "\n"
             
         if save_to:
             if not ink_service_base_url:
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import pickle
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from typing import Any
+
+import logfire
+
+
+class MemoBackend(ABC):
+    """
+    storage of memoized node results, values are opaque pickled bytes.
+    """
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        pass
+
+
+class LRUMemoBackend(MemoBackend):
+    """
+    in-process memo backend, evict the least recently used entry when full.
+    """
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class RedisMemoBackend(MemoBackend):
+    """
+    redis memo backend shared across processes.
+
+    each entry expires after `ttl` seconds, and an index sorted by write time
+    keeps at most `max_entries` entries, the oldest entries are evicted first.
+    """
+    # KEYS[1]: entry key, KEYS[2]: index key
+    # ARGV[1]: value, ARGV[2]: ttl, ARGV[3]: max entries, ARGV[4]: now
+    _SET_SCRIPT = """
+    redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+    redis.call("zadd", KEYS[2], ARGV[4], KEYS[1])
+    redis.call("zremrangebyscore", KEYS[2], "-inf", ARGV[4] - ARGV[2])
+    local overflow = redis.call("zcard", KEYS[2]) - tonumber(ARGV[3])
+    if overflow > 0 then
+        local evicted = redis.call("zpopmin", KEYS[2], overflow)
+        for i = 1, #evicted, 2 do
+            redis.call("del", evicted[i])
+        end
+    end
+    redis.call("expire", KEYS[2], ARGV[2])
+    return overflow
+    """
+
+    def __init__(self,
+                 client=None,
+                 ttl: int = 3600,
+                 max_entries: int = 10000,
+                 key_prefix: str = "graph_memo:") -> None:
+        if client is None:
+            from api.redis.constants import CLIENT
+            client = CLIENT
+        self.client = client
+        self.ttl = int(ttl)
+        self.max_entries = int(max_entries)
+        self.key_prefix = key_prefix
+        self._index_key = f"{key_prefix}__index__"
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(f"{self.key_prefix}{key}")
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.client.eval(self._SET_SCRIPT,
+                               2,
+                               f"{self.key_prefix}{key}",
+                               self._index_key,
+                               value,
+                               str(self.ttl),
+                               str(self.max_entries),
+                               str(time.time()))
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _canonical(value: Any) -> Any:
+    """
+    json form of a value that does not depend on set / dict ordering, hash seeds or shared references.
+    values without a structural form fall back to their pickle bytes.
+    """
+    if isinstance(value, Enum):
+        return ["enum", type(value).__qualname__, _canonical(value.value)]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [_canonical(v) for v in value]]
+    if isinstance(value, (set, frozenset)):
+        return [type(value).__name__, sorted((_canonical(v) for v in value), key=_dumps)]
+    if isinstance(value, dict):
+        return ["dict", sorted(([_canonical(k), _canonical(v)] for k, v in value.items()), key=_dumps)]
+    if isinstance(value, (bytes, bytearray)):
+        return [type(value).__name__, value.hex()]
+    if is_dataclass(value) and not isinstance(value, type):
+        return ["dataclass", type(value).__qualname__,
+                _canonical({f.name: getattr(value, f.name) for f in fields(value)})]
+    if callable(getattr(value, "model_dump", None)):
+        # pydantic models
+        return ["model", type(value).__qualname__, _canonical(value.model_dump())]
+    return ["pickle", type(value).__qualname__, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL).hex()]
+
+
+def make_memo_key(graph_name: str,
+                  node: str,
+                  init_params: dict[str, Any],
+                  run_params: dict[str, Any]) -> str | None:
+    """
+    content address of a node execution, None if the inputs can not be serialized.
+
+    the inputs are canonicalized before hashing, so the key is stable across processes and replicas.
+    """
+    try:
+        payload = _dumps([_canonical(init_params), _canonical(run_params)]).encode()
+    except Exception as e:
+        logfire.warning(f"Node {node} inputs can not be serialized, memoization skipped: {e}")
+        return None
+    return f"{graph_name}:{node}:{hashlib.sha256(payload).hexdigest()}"
+
+
+def dump_memo_entry(node_instance: Any, run_result: Any) -> bytes | None:
+    """
+    pickle the node state after run together with its return value.
+    """
+    try:
+        return pickle.dumps((node_instance.__dict__, run_result),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logfire.warning(f"Node {node_instance.__class__.__name__} result can not be pickled, memoization skipped: {e}")
+        return None
+
+
+def load_memo_entry(node_instance: Any, entry: bytes) -> Any:
+    """
+    restore the node state from a memo entry and return the memoized return value.
+    """
+    state, run_result = pickle.loads(entry)
+    node_instance.__dict__.update(state)
+    return run_result
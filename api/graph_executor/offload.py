@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Literal
+
+
+def _invoke_compute(node_instance: Any, run_params: dict[str, Any]) -> tuple[dict[str, Any], Any]:
+    """
+    executed in the worker, the node state is sent back since the worker holds a copy in a process pool.
+    """
+    run_result = node_instance.compute(**run_params)
+    return node_instance.__dict__, run_result
+
+
+class NodeExecutors:
+    """
+    pools executing the synchronous `compute` method of CPU bound nodes off the event loop.
+
+    the process pool pickles the node instance, its pull sources and its return value,
+    so they must be picklable and the node class must be importable by the worker.
+    the pools are created by `start` (called in the FastAPI lifespan) or lazily on first use,
+    and released by `shutdown`.
+    """
+    def __init__(self,
+                 max_process_workers: int | None = None,
+                 max_thread_workers: int | None = None,
+                 mp_start_method: str = "spawn") -> None:
+        self.max_process_workers = max_process_workers
+        self.max_thread_workers = max_thread_workers
+        self.mp_start_method = mp_start_method
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._thread_pool: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_process_workers,
+                mp_context=multiprocessing.get_context(self.mp_start_method),
+            )
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_thread_workers,
+                thread_name_prefix="graph_node",
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._thread_pool = None
+
+    def _get_executor(self, kind: Literal["process", "thread"]) -> Executor:
+        if kind == "process":
+            if self._process_pool is None:
+                self.start()
+            return self._process_pool
+        if kind == "thread":
+            if self._thread_pool is None:
+                self.start()
+            return self._thread_pool
+        msg = f"Unknown node executor {kind}"
+        raise ValueError(msg)
+
+    async def compute(self,
+                      kind: Literal["process", "thread"],
+                      node_instance: Any,
+                      run_params: dict[str, Any]) -> Any:
+        """
+        run `node_instance.compute(**run_params)` in the pool, update the node state and return its result.
+        """
+        loop = asyncio.get_running_loop()
+        state, run_result = await loop.run_in_executor(self._get_executor(kind),
+                                                       _invoke_compute,
+                                                       node_instance,
+                                                       run_params)
+        if kind == "process":
+            node_instance.__dict__.update(state)
+        return run_result
@@ -0,0 +1,139 @@
+import time
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+
+@dataclass
+class NodeTiming:
+    """
+    timestamps (time.perf_counter) of one node in one run.
+    """
+    node: str
+    ready_at: float
+    run_started_at: float | None = None
+    finished_at: float | None = None
+    param_time: float = 0.0
+    bypassed: bool = False
+
+    @property
+    def queue_wait(self) -> float:
+        """
+        from ready to run start, excluding param processing, includes pool waits.
+        """
+        if self.run_started_at is None:
+            return 0.0
+        return max(0.0, self.run_started_at - self.ready_at - self.param_time)
+
+    @property
+    def run_time(self) -> float:
+        if self.run_started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.run_started_at
+
+    @property
+    def total_time(self) -> float:
+        if self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.ready_at
+
+
+@dataclass
+class GraphProfileReport:
+    """
+    per-node timings and the critical path of one graph run, durations in seconds.
+    """
+    graph_name: str
+    total_time: float
+    # the chain of nodes which decided the end of the run, from first to last
+    critical_path: list[str]
+    critical_path_run_time: float
+    nodes: dict[str, NodeTiming] = field(default_factory=dict)
+
+    def dominant_node(self) -> str | None:
+        """
+        node with the longest run time on the critical path.
+        """
+        if not self.critical_path:
+            return None
+        return max(self.critical_path, key=lambda n: self.nodes[n].run_time)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "graph_name": self.graph_name,
+            "total_time": self.total_time,
+            "critical_path": self.critical_path,
+            "critical_path_run_time": self.critical_path_run_time,
+            "nodes": {
+                name: {
+                    **asdict(timing),
+                    "queue_wait": timing.queue_wait,
+                    "run_time": timing.run_time,
+                    "total_time": timing.total_time,
+                }
+                for name, timing in self.nodes.items()
+            },
+        }
+
+
+class GraphProfiler:
+    """
+    collect node timings of a run when passed to `start(..., profiler=...)`,
+    the report is available by `report` once the run ends.
+    """
+    def __init__(self) -> None:
+        self.graph_name: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.timings: dict[str, NodeTiming] = {}
+        self.report: GraphProfileReport | None = None
+
+    def run_started(self, graph_name: str) -> None:
+        self.graph_name = graph_name
+        self.started_at = time.perf_counter()
+
+    def node_ready(self, node: str) -> None:
+        self.timings[node] = NodeTiming(node, time.perf_counter())
+
+    def add_param_time(self, node: str, duration: float) -> None:
+        self.timings[node].param_time += duration
+
+    def node_run_started(self, node: str) -> None:
+        self.timings[node].run_started_at = time.perf_counter()
+
+    def node_bypassed(self, node: str) -> None:
+        self.timings[node].bypassed = True
+
+    def node_finished(self, node: str) -> None:
+        self.timings[node].finished_at = time.perf_counter()
+
+    def run_finished(self, predecessor_graph: Mapping[str, frozenset[str]]) -> GraphProfileReport:
+        self.finished_at = time.perf_counter()
+        critical_path = self._critical_path(predecessor_graph)
+        self.report = GraphProfileReport(
+            graph_name=self.graph_name,
+            total_time=self.finished_at - self.started_at,
+            critical_path=critical_path,
+            critical_path_run_time=sum(self.timings[n].run_time for n in critical_path),
+            nodes=dict(self.timings),
+        )
+        return self.report
+
+    def _critical_path(self, predecessor_graph: Mapping[str, frozenset[str]]) -> list[str]:
+        """
+        walk back from the last finished node, each step to the predecessor which finished last,
+        i.e. the one the node was actually waiting for.
+        """
+        finished = {n: t for n, t in self.timings.items() if t.finished_at is not None}
+        if not finished:
+            return []
+        node = max(finished, key=lambda n: finished[n].finished_at)
+        path = [node]
+        while True:
+            predecessors = [p for p in predecessor_graph.get(node, ()) if p in finished]
+            if not predecessors:
+                break
+            node = max(predecessors, key=lambda n: finished[n].finished_at)
+            path.append(node)
+        path.reverse()
+        return path
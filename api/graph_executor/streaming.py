@@ -0,0 +1,66 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class StreamReturn:
+    """
+    yielded by a streaming `run` (an async generator) to hand its return value to the param pool,
+    everything else it yields is a partial output pushed to the stream consumers.
+    """
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+class NodeStream(Generic[T]):
+    """
+    partial outputs of a streaming node within one graph run.
+
+    a node accepts a stream by annotating a run parameter as NodeStream["Producer"],
+    it is then scheduled without waiting for the producer to finish and iterates the
+    partial outputs while they are produced. Every consumer sees every output from the start.
+    """
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._chunks: list[Any] = []
+        self._closed = False
+        self._error: BaseException | None = None
+        self._changed = asyncio.Event()
+
+    def push(self, chunk: Any) -> None:
+        if self._closed:
+            msg = f"Stream of {self.source} is closed"
+            raise RuntimeError(msg)
+        self._chunks.append(chunk)
+        self._notify()
+
+    def close(self, error: BaseException | None = None) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        self._notify()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self._chunks):
+                yield self._chunks[index]
+                index += 1
+            if self._closed:
+                if self._error is not None:
+                    msg = f"Stream of {self.source} is broken"
+                    raise RuntimeError(msg) from self._error
+                return
+            await changed.wait()
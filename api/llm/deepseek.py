@@ -3,6 +3,11 @@ from functools import lru_cache
 
 from openai import AsyncOpenAI
 
+from api.llm.http_transport import SHARED_HTTP_CLIENTS
+
+# 对话前缀续写 (流式续传) 只在 beta 接口可用, beta 接口同样支持普通对话
+DEEPSEEK_BASE_URL = "https://api.deepseek.com/beta"
+
 @lru_cache(maxsize=1)
 def async_client() -> AsyncOpenAI:
     key = os.getenv("DEEPSEEK_API_KEY")
@@ -10,5 +15,6 @@ def async_client() -> AsyncOpenAI:
         raise RuntimeError("DEEPSEEK_API_KEY is not set")
     return AsyncOpenAI(
         api_key=key,
-        base_url="https://api.deepseek.com",
+        base_url=DEEPSEEK_BASE_URL,
+        http_client=SHARED_HTTP_CLIENTS.client_for(DEEPSEEK_BASE_URL),
     )
\ No newline at end of file
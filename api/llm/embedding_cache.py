@@ -0,0 +1,81 @@
+import hashlib
+from array import array
+from collections import OrderedDict
+
+import logfire
+from openai import NotGiven
+
+
+def embedding_cache_key(model: str, dimensions: int | NotGiven, text: str) -> str:
+    """按模型、维度与文本哈希确定的缓存键"""
+    dims = "default" if isinstance(dimensions, NotGiven) else str(dimensions)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dims}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    两级 embedding 缓存
+    第一级为进程内 LRU, 第二级为 Redis (向量以 float64 字节保存, 与进程内缓存的精度一致, ttl 秒后过期);
+    Redis 不可用时只使用进程内缓存
+    """
+    def __init__(self,
+                 max_size: int = 10000,
+                 client=None,
+                 use_redis: bool = True,
+                 ttl: int = 7 * 24 * 3600,
+                 key_prefix: str = "embedding_cache:f64:") -> None:
+        if client is None and use_redis:
+            from api.redis.constants import CLIENT
+            client = CLIENT
+        self.client = client
+        self.max_size = max_size
+        self.ttl = int(ttl)
+        self.key_prefix = key_prefix
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        for key in keys:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                found[key] = embedding
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if not missing or self.client is None:
+            return found
+        try:
+            values = await self.client.mget([f"{self.key_prefix}{key}" for key in missing])
+        except Exception as e:
+            logfire.warning(f"Embedding cache redis lookup failed: {e}")
+            return found
+        for key, value in zip(missing, values):
+            if value is None:
+                continue
+            embedding = array("d", value).tolist()
+            self._remember(key, embedding)
+            found[key] = embedding
+        return found
+
+    async def set_many(self, embeddings: dict[str, list[float]]) -> None:
+        for key, embedding in embeddings.items():
+            self._remember(key, embedding)
+        if not embeddings or self.client is None:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, embedding in embeddings.items():
+                    pipe.set(f"{self.key_prefix}{key}", array("d", embedding).tobytes(), ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logfire.warning(f"Embedding cache redis write failed: {e}")
+
+
+EMBEDDING_CACHE = EmbeddingCache()
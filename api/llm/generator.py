@@ -1,4 +1,6 @@
 import asyncio
+import email.utils
+import time
 from collections.abc import Iterable
 from typing import Any, Literal, Optional, overload
 from api.load_balance.service_instance import AsyncOpenAIServiceInstance
@@ -21,6 +23,28 @@ DEFAULT_RETRY_CONFIG = RetryConfigForAPIError(
     error_code_to_match=["429", "limit_requests"]
 )
 
+
+def retry_after_seconds(error: openai.APIError) -> float | None:
+    """
+    读取错误响应的 retry-after-ms / retry-after 响应头 (秒数或 HTTP 日期), 没有时返回 None
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if (value := headers.get("retry-after-ms")) is not None:
+            return max(0.0, float(value) / 1000)
+        if (value := headers.get("retry-after")) is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+                return max(0.0, retry_at - time.time())
+    except (TypeError, ValueError):
+        return None
+    return None
+
 @overload
 async def openai_async_generate(client: AsyncOpenAI,
                           model: str,
@@ -49,10 +73,17 @@ async def openai_async_generate(client: AsyncOpenAI,
             messages=messages,
             **kwarg,
         )
+    except openai.APITimeoutError as e:
+        logfire.warning(f"OpenAI API request timed out: {e.message}")
+        raise RequestTimeoutError from e
+    except (openai.APIConnectionError, openai.InternalServerError) as e:
+        # 连接失败与 5xx 视为实例故障, 交由负载均衡器重试与熔断
+        logfire.warning(f"OpenAI API service error: {e.message}")
+        raise ServiceError(retry_after=retry_after_seconds(e)) from e
     except openai.APIError as e:
-        if e.code in retry_configs.error_code_to_match:
+        if e.code in retry_configs.error_code_to_match or isinstance(e, openai.RateLimitError):
             logfire.warning(f"Retrying... OpenAI API Error Code {e.code}.OpenAI API Error: {e.message}")
-            raise LimitExceededError from e
+            raise LimitExceededError(retry_after=retry_after_seconds(e)) from e
         
         logfire.error(f"Unexpected OpenAI API Error Code {e.code}.OpenAI API Error: {e.message}")
         raise
@@ -65,9 +96,19 @@ async def openai_async_embedding(client: AsyncOpenAI,
                                  model: str, 
                                  dimensions: int | NotGiven = NOT_GIVEN,
                                  encoding_format: str = "float") -> CreateEmbeddingResponse:
-    return await client.embeddings.create(
-        model=model,
-        input=text,
-        dimensions=dimensions,
-        encoding_format=encoding_format,
-    )
\ No newline at end of file
+    try:
+        return await client.embeddings.create(
+            model=model,
+            input=text,
+            dimensions=dimensions,
+            encoding_format=encoding_format,
+        )
+    except openai.APITimeoutError as e:
+        logfire.warning(f"OpenAI API request timed out: {e.message}")
+        raise RequestTimeoutError from e
+    except (openai.APIConnectionError, openai.InternalServerError) as e:
+        logfire.warning(f"OpenAI API service error: {e.message}")
+        raise ServiceError(retry_after=retry_after_seconds(e)) from e
+    except openai.RateLimitError as e:
+        logfire.warning(f"Retrying... OpenAI API Error Code {e.code}.OpenAI API Error: {e.message}")
+        raise LimitExceededError(retry_after=retry_after_seconds(e)) from e
\ No newline at end of file
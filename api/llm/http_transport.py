@@ -0,0 +1,164 @@
+import asyncio
+import importlib.util
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+import logfire
+
+# HTTP/2 需要 h2 (httpx[http2]), 未安装时退回 HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+POOL_CONNECTIONS_GAUGE = logfire.metric_gauge(
+    "llm_http_pool_connections",
+    unit="{connection}",
+    description="open connections of the shared LLM http client of a provider host",
+)
+POOL_IDLE_CONNECTIONS_GAUGE = logfire.metric_gauge(
+    "llm_http_pool_idle_connections",
+    unit="{connection}",
+    description="idle keep-alive connections of the shared LLM http client of a provider host",
+)
+POOL_ACTIVE_REQUESTS_GAUGE = logfire.metric_gauge(
+    "llm_http_pool_active_requests",
+    unit="{request}",
+    description="requests assigned to a connection of the shared LLM http client of a provider host",
+)
+POOL_QUEUED_REQUESTS_GAUGE = logfire.metric_gauge(
+    "llm_http_pool_queued_requests",
+    unit="{request}",
+    description="requests waiting for a free connection of the shared LLM http client of a provider host",
+)
+
+
+@dataclass
+class PoolStats:
+    connections: int = 0
+    idle_connections: int = 0
+    active_requests: int = 0
+    queued_requests: int = 0
+
+
+class _HostTransport(httpx.AsyncBaseTransport):
+    """转发到主机当前的连接池, 使长期持有的客户端在连接池关闭并重建后仍然可用"""
+    def __init__(self, owner: "SharedHttpClients", host: str) -> None:
+        self._owner = owner
+        self._host = host
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._owner.transport_for(self._host).handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # 连接池由 SharedHttpClients.aclose() 关闭
+        pass
+
+
+class SharedHttpClients:
+    """
+    按供应商主机共享的 httpx.AsyncClient
+    同一主机的所有 AsyncOpenAI 客户端复用一个连接池, 开启 HTTP/2 时并发流复用少量连接,
+    避免每个客户端各自建连与 TLS 握手
+    客户端在进程内长期有效; 连接池由应用生命周期 start() 创建 (或在首次请求时创建), aclose() 关闭,
+    之后的请求 (如同一进程中的下一个生命周期) 使用新建的连接池
+    """
+    def __init__(self,
+                 max_connections: int = 1000,
+                 max_keepalive_connections: int = 100,
+                 keepalive_expiry: float = 60,
+                 timeout: httpx.Timeout = httpx.Timeout(600, connect=5),
+                 http2: bool = True,
+                 metrics_interval: float = 5) -> None:
+        """
+        :param max_connections: 每个主机的最大连接数, 默认与 openai 客户端一致, HTTP/2 下每个连接可承载多个并发流
+        :param max_keepalive_connections: 每个主机保留的空闲长连接数, 默认与 openai 客户端一致
+        :param keepalive_expiry: 空闲长连接的保留秒数
+        :param http2: 是否启用 HTTP/2, 未安装 h2 时忽略
+        :param metrics_interval: 连接池指标的上报间隔秒数
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.metrics_interval = metrics_interval
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._transports: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._metrics_task: asyncio.Task | None = None
+
+    def client_for(self, base_url: str) -> httpx.AsyncClient:
+        """base_url 所在主机的共享客户端, 可在构造时传给 AsyncOpenAI 并长期持有"""
+        host = urlsplit(base_url).netloc
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=_HostTransport(self, host),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+            self._clients[host] = client
+        return client
+
+    def transport_for(self, host: str) -> httpx.AsyncHTTPTransport:
+        """主机当前的连接池, 不存在时创建"""
+        transport = self._transports.get(host)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits)
+            self._transports[host] = transport
+        return transport
+
+    def pool_stats(self) -> dict[str, PoolStats]:
+        """各主机连接池的占用情况"""
+        stats = {}
+        for host, transport in self._transports.items():
+            # httpx 未公开连接池状态, 读取底层 httpcore 连接池
+            pool = getattr(transport, "_pool", None)
+            if pool is None:
+                continue
+            connections = list(pool.connections)
+            requests = list(getattr(pool, "_requests", []))
+            queued = sum(1 for request in requests if request.is_queued())
+            stats[host] = PoolStats(
+                connections=len(connections),
+                idle_connections=sum(1 for connection in connections if connection.is_idle()),
+                active_requests=len(requests) - queued,
+                queued_requests=queued,
+            )
+        return stats
+
+    def report_metrics(self) -> None:
+        for host, stats in self.pool_stats().items():
+            attributes = {"host": host}
+            POOL_CONNECTIONS_GAUGE.set(stats.connections, attributes)
+            POOL_IDLE_CONNECTIONS_GAUGE.set(stats.idle_connections, attributes)
+            POOL_ACTIVE_REQUESTS_GAUGE.set(stats.active_requests, attributes)
+            POOL_QUEUED_REQUESTS_GAUGE.set(stats.queued_requests, attributes)
+
+    async def _report_metrics_periodically(self) -> None:
+        while True:
+            self.report_metrics()
+            await asyncio.sleep(self.metrics_interval)
+
+    def start(self) -> None:
+        """创建已知主机的连接池并开始定期上报连接池指标, 需在事件循环中调用"""
+        for host in self._clients:
+            self.transport_for(host)
+        if self._metrics_task is None or self._metrics_task.done():
+            self._metrics_task = asyncio.get_running_loop().create_task(self._report_metrics_periodically())
+
+    async def aclose(self) -> None:
+        """停止指标上报并关闭所有主机的连接池, 客户端仍然可用, 下次请求时重新创建连接池"""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            try:
+                await self._metrics_task
+            except asyncio.CancelledError:
+                pass
+            self._metrics_task = None
+        transports, self._transports = list(self._transports.values()), {}
+        await asyncio.gather(*(transport.aclose() for transport in transports))
+
+
+# 所有 LLM 供应商客户端共享, 生命周期由 api.app.main 的 lifespan 管理
+SHARED_HTTP_CLIENTS = SharedHttpClients()
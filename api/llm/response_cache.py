@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, TypeVar
+
+import ujson
+
+T = TypeVar("T")
+
+# 不影响生成结果的请求参数, 不参与缓存键
+_NON_SEMANTIC_PARAMS = frozenset({"timeout", "extra_headers", "extra_query"})
+
+
+def _canonical(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump(mode="json", exclude_none=True))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def make_response_cache_key(model: str, messages: Iterable[Any], params: dict[str, Any]) -> str:
+    """
+    按模型、规范化的消息与采样参数确定的缓存键
+    在负载均衡之前查找时实例尚未选定, model 可传服务名
+    """
+    payload = {
+        "model": model,
+        "messages": _canonical(list(messages)),
+        "params": _canonical({k: v for k, v in params.items() if k not in _NON_SEMANTIC_PARAMS}),
+    }
+    return hashlib.sha256(ujson.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    非流式生成的精确匹配缓存
+    命中的响应在 ttl 秒内复用, 超过 max_size 时淘汰最久未使用的条目;
+    相同键的并发请求共享同一次上游调用, 失败的调用不缓存
+    只应用于确定性的请求 (如结构化抽取), 采样温度较高的请求不宜开启
+    应在 LoadBalancer.execute 之前查找, 使命中不占用实例的限额, 也不计入延迟统计
+    """
+    def __init__(self, max_size: int = 1024, ttl: float = 600) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(self,
+                            key: str,
+                            factory: Callable[[], Awaitable[T]],
+                            cacheable: Callable[[T], bool] | None = None) -> T:
+        """
+        cacheable: 只缓存通过该检查的结果, 未通过的结果仍返回给共享本次调用的调用方
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._create(key, factory, cacheable))
+            self._in_flight[key] = task
+        # 一个调用方取消时不影响共享同一调用的其他调用方
+        return await asyncio.shield(task)
+
+    async def _create(self,
+                      key: str,
+                      factory: Callable[[], Awaitable[T]],
+                      cacheable: Callable[[T], bool] | None) -> T:
+        try:
+            value = await factory()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
@@ -3,6 +3,10 @@ from functools import lru_cache
 
 from openai import AsyncOpenAI
 
+from api.llm.http_transport import SHARED_HTTP_CLIENTS
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
 @lru_cache(maxsize=1)
 def async_client() -> AsyncOpenAI:
     key = os.getenv("DASHSCOPE_API_KEY")
@@ -10,5 +14,6 @@ def async_client() -> AsyncOpenAI:
         raise RuntimeError("DASHSCOPE_API_KEY is not set")
     return AsyncOpenAI(
         api_key=key,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+        base_url=DASHSCOPE_BASE_URL,
+        http_client=SHARED_HTTP_CLIENTS.client_for(DASHSCOPE_BASE_URL),
     )
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+
+import logfire
+
+# 各实例当前的自适应并发上限
+CONCURRENCY_LIMIT_GAUGE = logfire.metric_gauge(
+    "llm_instance_concurrency_limit",
+    unit="{request}",
+    description="adaptive concurrency limit of a load balanced LLM service instance",
+)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    实例的自适应并发上限 (AIMD)
+    并发被充分利用时每次成功请求将上限加 1; 遇到限流 / 超时时上限乘以 backoff_ratio, 但不低于 min_limit.
+    LLM 的延迟随输入输出长度变化很大, 不作为过载信号
+    并发已满时请求在 FIFO 队列中等待名额, 有排队请求时新请求不能插队
+    """
+    def __init__(self,
+                 name: str,
+                 initial_limit: int = 20,
+                 min_limit: int = 4,
+                 max_limit: int = 1000,
+                 backoff_ratio: float = 0.9) -> None:
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(max(initial_limit, min_limit))
+        self._in_flight = 0
+        # 已被唤醒但尚未占用名额的排队请求数, 这些名额为其保留
+        self._woken = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def has_capacity(self, reserved: bool = False) -> bool:
+        """
+        :param reserved: 请求排队后被唤醒, 持有保留的名额, 不受排队中的其他请求限制
+        """
+        if reserved:
+            return self._in_flight < self.limit
+        return self._in_flight + self._woken < self.limit and not self._waiters
+
+    def on_request_start(self) -> None:
+        self._in_flight += 1
+
+    def on_request_abandoned(self) -> None:
+        """已占用名额的请求在发出前被放弃 (如实例限流), 只归还名额"""
+        self._in_flight -= 1
+        self._wake()
+
+    def on_request_end(self, dropped: bool, succeeded: bool) -> None:
+        """
+        流式请求在流被消费完或关闭时才调用
+        :param dropped: 请求被限流或超时, 表示超出了实例的承载能力
+        :param succeeded: 请求成功
+        """
+        in_flight = self._in_flight
+        self._in_flight -= 1
+        if dropped:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            self._publish()
+        elif succeeded and in_flight * 2 >= self._limit:
+            # 只有并发被充分利用时才提高上限, 避免空闲时上限无限增长
+            self._limit = min(self.max_limit, self._limit + 1)
+            self._publish()
+        self._wake()
+
+    def wait_for_capacity(self, first: bool = False) -> asyncio.Future[None]:
+        """
+        排队等待名额, 有名额时 future 完成并为其保留一个名额; 等待结束后必须调用 cancel_wait
+        :param first: 排在队首, 用于被唤醒后又被他人抢先的请求
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        if first:
+            self._waiters.appendleft(waiter)
+        else:
+            self._waiters.append(waiter)
+        self._wake()
+        return waiter
+
+    def cancel_wait(self, waiter: asyncio.Future[None]) -> bool:
+        """结束排队, 返回是否已被唤醒; 被唤醒的请求尝试占用名额后必须调用 release_reservation"""
+        if waiter.done() and not waiter.cancelled():
+            return True
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        return False
+
+    def release_reservation(self) -> None:
+        """归还被唤醒时保留的名额, 请求已占用名额 (on_request_start) 或放弃时调用"""
+        self._woken -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight + self._woken < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._woken += 1
+
+    def _publish(self) -> None:
+        CONCURRENCY_LIMIT_GAUGE.set(self.limit, {"instance": self.name})
@@ -0,0 +1,140 @@
+import asyncio
+import math
+from collections import deque
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TypeVar
+
+from .exception import AdmissionRejectedError
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """请求优先级, 数值越小越优先"""
+    INTERACTIVE = 0   # 用户实时对话
+    BACKGROUND = 1    # 后台任务 (角色更新、A2A 任务、结构化抽取等)
+
+
+# 当前协程发出的 LLM 请求的优先级, 未设置时视为用户实时请求
+REQUEST_PRIORITY: ContextVar[Priority] = ContextVar("REQUEST_PRIORITY", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """在上下文内 (包括其中创建的子任务) 以 priority 发出请求"""
+    token = REQUEST_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        REQUEST_PRIORITY.reset(token)
+
+
+async def run_with_priority(priority: Priority, awaitable: Awaitable[T]) -> T:
+    """以 priority 执行 awaitable, 用于包装交给 asyncio.create_task 的后台协程"""
+    with request_priority(priority):
+        return await awaitable
+
+
+@dataclass(frozen=True)
+class PriorityClassConfig:
+    share: float = 1.0                     # 该优先级最多占用的并发比例
+    max_queue_time: float | None = None    # 最长排队时间(秒), 超时拒绝
+    max_queue_length: int | None = None    # 最大排队数, 队列满时直接拒绝
+
+
+DEFAULT_PRIORITY_CLASSES: dict[Priority, PriorityClassConfig] = {
+    Priority.INTERACTIVE: PriorityClassConfig(share=1.0, max_queue_time=30),
+    # 后台任务最多占用一半并发, 为用户请求保留余量
+    Priority.BACKGROUND: PriorityClassConfig(share=0.5, max_queue_time=300),
+}
+
+
+class AdmissionController:
+    """
+    服务级的优先级准入控制
+    同时在途的请求数不超过 max_concurrency, 每个优先级不超过其份额;
+    有空闲名额时按优先级从高到低、同优先级先到先得放行排队的请求,
+    排队超时或队列已满的请求以 AdmissionRejectedError 拒绝 (削峰)
+    """
+    def __init__(self,
+                 max_concurrency: int,
+                 classes: dict[Priority, PriorityClassConfig] | None = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.classes = classes or DEFAULT_PRIORITY_CLASSES
+        self._running: dict[Priority, int] = {p: 0 for p in Priority}
+        self._waiters: dict[Priority, deque[asyncio.Future]] = {p: deque() for p in Priority}
+
+    def running(self, priority: Priority | None = None) -> int:
+        if priority is None:
+            return sum(self._running.values())
+        return self._running[priority]
+
+    def queued(self, priority: Priority) -> int:
+        return sum(1 for f in self._waiters[priority] if not f.done())
+
+    def _class_limit(self, priority: Priority) -> int:
+        share = self.classes.get(priority, PriorityClassConfig()).share
+        return max(1, math.ceil(share * self.max_concurrency))
+
+    def _can_admit(self, priority: Priority) -> bool:
+        return self.running() < self.max_concurrency and \
+            self._running[priority] < self._class_limit(priority)
+
+    def _has_waiters_ahead(self, priority: Priority) -> bool:
+        return any(self.queued(p) for p in Priority if p <= priority)
+
+    async def acquire(self, priority: Priority) -> None:
+        if not self._has_waiters_ahead(priority) and self._can_admit(priority):
+            self._running[priority] += 1
+            return
+
+        config = self.classes.get(priority, PriorityClassConfig())
+        if config.max_queue_length is not None and self.queued(priority) >= config.max_queue_length:
+            msg = f"Admission queue of {priority.name} is full"
+            raise AdmissionRejectedError(msg)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        try:
+            async with asyncio.timeout(config.max_queue_time):
+                await future
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # 超时或取消与放行同时发生, 归还刚拿到的名额
+                self.release(priority)
+            else:
+                future.cancel()
+                self._drop(priority, future)
+            if isinstance(e, TimeoutError):
+                msg = f"{priority.name} request queued longer than {config.max_queue_time}s"
+                raise AdmissionRejectedError(msg) from e
+            raise
+
+    def release(self, priority: Priority) -> None:
+        self._running[priority] -= 1
+        self._wake()
+
+    def _drop(self, priority: Priority, future: asyncio.Future) -> None:
+        try:
+            self._waiters[priority].remove(future)
+        except ValueError:
+            pass
+        # 排在前面的请求离开后, 后面的请求可能可以放行
+        self._wake()
+
+    def _wake(self) -> None:
+        for priority in sorted(Priority):
+            waiters = self._waiters[priority]
+            while waiters and self._can_admit(priority):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                self._running[priority] += 1
+                future.set_result(None)
+            if any(not f.done() for f in waiters):
+                # 高优先级仍在排队时, 低优先级不能越过
+                return
@@ -0,0 +1,106 @@
+import time
+from collections import deque
+from enum import Enum
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"        # 正常转发
+    OPEN = "open"            # 已摘除, 不转发
+    HALF_OPEN = "half_open"  # 冷却结束, 放行探测请求
+
+
+class CircuitBreaker:
+    """
+    服务实例的熔断器
+    连续失败次数或窗口内错误率超过阈值时熔断 (OPEN), 冷却 open_duration 秒后进入 HALF_OPEN,
+    放行至多 half_open_probes 个探测请求; 探测成功则恢复 (CLOSED), 失败则重新熔断
+    只统计 ServiceError / RequestTimeoutError, 限流错误不视为实例故障
+    """
+    def __init__(
+        self,
+        failure_threshold: int = 5,           # 连续失败次数阈值
+        error_rate_threshold: float = 0.5,     # 窗口内错误率阈值
+        window_size: int = 20,                 # 错误率统计窗口 (最近请求数)
+        min_window_requests: int = 10,         # 统计错误率所需的最少请求数
+        open_duration: float = 30,             # 熔断冷却时间(秒)
+        half_open_probes: int = 1,             # 半开状态下同时放行的探测请求数
+    ):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_window_requests = min_window_requests
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._window: deque[bool] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_after() == 0:
+            self._state = CircuitState.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """熔断状态下距离可以探测的秒数"""
+        if self._state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_duration - time.monotonic())
+
+    def available(self) -> bool:
+        """当前是否可以向实例发送请求"""
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return True
+        if state is CircuitState.HALF_OPEN:
+            return self._probes_in_flight < self.half_open_probes
+        return False
+
+    def on_request_start(self) -> None:
+        if self.state is CircuitState.HALF_OPEN:
+            self._probes_in_flight += 1
+
+    def record_success(self) -> None:
+        self._release_probe()
+        self._consecutive_failures = 0
+        self._window.append(True)
+        if self._state is CircuitState.HALF_OPEN:
+            self._close()
+
+    def record_failure(self) -> None:
+        self._release_probe()
+        self._consecutive_failures += 1
+        self._window.append(False)
+        if self._state is CircuitState.HALF_OPEN or self._should_open():
+            self._open()
+
+    def record_ignored(self) -> None:
+        """请求以与实例健康无关的结果结束 (如限流), 只释放探测名额"""
+        self._release_probe()
+
+    def _release_probe(self) -> None:
+        if self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def _should_open(self) -> bool:
+        if self._state is not CircuitState.CLOSED:
+            return False
+        if self._consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._window) < self.min_window_requests:
+            return False
+        error_rate = self._window.count(False) / len(self._window)
+        return error_rate >= self.error_rate_threshold
+
+    def _open(self) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def _close(self) -> None:
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._window.clear()
@@ -1,3 +1,4 @@
+from .admission import Priority, PriorityClassConfig
 from .load_balancer import LoadBalancer
 from .service_instance import AsyncOpenAIServiceInstance
 from .service_regeistry import ServiceConfig, ServiceRegistry
@@ -20,4 +21,13 @@ QWEN_3_235B_SERVICE_NAME = "qwen3-235b-a22b"
 QWEN_MAX_SERVICE_NAME = "qwen-max"
 QWEN_PLUS_SERVICE_NAME = "qwen-plus"
 QWEN_VL_OCR_SERVICE_NAME = "qwen-vl-ocr"
-QWEN_TEXT_EMBEDDING_SERVICE_NAME = "qwen-text-embedding"
\ No newline at end of file
+QWEN_TEXT_EMBEDDING_SERVICE_NAME = "qwen-text-embedding"
+
+# 共享对话服务的准入控制, 调整方法见 README 的 "优先级与准入控制"
+# 每个服务 (跨该服务所有实例) 同时在途的请求数, 流式对话在消费完之前一直占用名额
+CHAT_SERVICE_MAX_CONCURRENCY = 64
+CHAT_PRIORITY_CLASSES: dict[Priority, PriorityClassConfig] = {
+    Priority.INTERACTIVE: PriorityClassConfig(share=1.0, max_queue_time=30),
+    # 后台任务 (A2A 任务、角色更新、结构化抽取) 最多占用一半名额, 排满时排队而不是挤占用户对话
+    Priority.BACKGROUND: PriorityClassConfig(share=0.5, max_queue_time=300, max_queue_length=256),
+}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
 from typing import Any, Literal, overload
 
 from openai import NOT_GIVEN, AsyncOpenAI, AsyncStream, NotGiven
@@ -8,6 +8,7 @@ from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 
 from api.llm.data_model import RetryConfigForAPIError
 from api.llm.generator import openai_async_generate, openai_async_embedding
+from api.load_balance.exception import StreamNotResumableError
 from api.load_balance.service_instance import (
     AsyncOpenAIServiceInstance,
     ServiceInstanceBase,
@@ -66,4 +67,100 @@ async def embedding_delegate_for_async_openai(
         model=service_instance.model,
         dimensions=dimensions,
         encoding_format=encoding_format,
-    )
\ No newline at end of file
+    )
+
+
+def _forwarded_text(chunks: list[ChatCompletionChunk]) -> tuple[str, str, bool]:
+    """已转发分块中的 (content, reasoning_content, 是否包含工具调用)"""
+    content, reasoning, has_tool_calls = [], [], False
+    for chunk in chunks:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.tool_calls:
+            has_tool_calls = True
+        if delta.content:
+            content.append(delta.content)
+        if delta.model_extra and delta.model_extra.get("reasoning_content"):
+            reasoning.append(delta.model_extra["reasoning_content"])
+    return "".join(content), "".join(reasoning), has_tool_calls
+
+
+async def _skip_forwarded(stream: AsyncStream[ChatCompletionChunk],
+                          content_offset: int,
+                          reasoning_offset: int,
+                          drop_reasoning: bool) -> AsyncIterator[ChatCompletionChunk]:
+    """
+    跳过重新生成的流中已经转发过的前 content_offset / reasoning_offset 个字符
+    drop_reasoning 时丢弃全部推理内容 (前缀续写时推理阶段已经结束)
+    """
+    async for chunk in stream:
+        if chunk.choices:
+            delta = chunk.choices[0].delta
+            if delta.content and content_offset:
+                skipped = min(content_offset, len(delta.content))
+                content_offset -= skipped
+                delta.content = delta.content[skipped:]
+            extra = delta.model_extra
+            if extra and extra.get("reasoning_content"):
+                if drop_reasoning:
+                    extra["reasoning_content"] = ""
+                elif reasoning_offset:
+                    skipped = min(reasoning_offset, len(extra["reasoning_content"]))
+                    reasoning_offset -= skipped
+                    extra["reasoning_content"] = extra["reasoning_content"][skipped:]
+        yield chunk
+
+
+def resumable_generation_delegate_for_async_openai(
+        messages: Iterable[ChatCompletionMessageParam],
+        retry_configs: RetryConfigForAPIError,
+        /,
+        resume: Literal["prefix", "replay"] = "prefix",
+        **kwargs: dict[str, Any],
+) -> Callable[[ServiceInstanceBase, list[ChatCompletionChunk]],
+              Awaitable[AsyncIterator[ChatCompletionChunk]]]:
+    """
+    构造 LoadBalancer.execute_stream 的流式生成请求函数
+
+    流中途断开后的续传方式:
+    - prefix: 续传实例在 meta_data 中声明了 assistant_prefix_field 时 (DeepSeek beta 接口的 prefix、通义的 partial),
+      把已转发的内容作为 assistant 前缀续写; 未声明的实例不会识别前缀字段, 改用 replay
+    - replay: 重新发出原请求, 丢弃新流中与已转发内容等长的开头部分.
+      新流是另一次采样, 除非解码是确定的 (如 temperature=0 且供应商输出稳定), 拼接结果来自两个不同的回答
+    尚未转发任何正文时总是重新发出原请求; 已转发工具调用时无法续传, 抛出 StreamNotResumableError
+    """
+    messages = list(messages)
+
+    async def request(service_instance: ServiceInstanceBase,
+                      forwarded: list[ChatCompletionChunk]) -> AsyncIterator[ChatCompletionChunk]:
+        assert isinstance(service_instance, AsyncOpenAIServiceInstance)
+        content, reasoning, has_tool_calls = _forwarded_text(forwarded)
+        if has_tool_calls:
+            msg = "Stream broken while streaming tool calls"
+            raise StreamNotResumableError(msg)
+
+        prefix_field = service_instance.meta_data.get("assistant_prefix_field")
+        if content and resume == "prefix" and prefix_field:
+            resumed_messages = [*messages, {"role": "assistant", "content": content, prefix_field: True}]
+            stream = await openai_async_generate(
+                client=service_instance.client,
+                model=service_instance.model,
+                messages=resumed_messages,
+                retry_configs=retry_configs,
+                **kwargs,
+            )
+            return _skip_forwarded(stream, 0, 0, drop_reasoning=True)
+
+        stream = await openai_async_generate(
+            client=service_instance.client,
+            model=service_instance.model,
+            messages=messages,
+            retry_configs=retry_configs,
+            **kwargs,
+        )
+        if not forwarded:
+            return stream
+        return _skip_forwarded(stream, len(content), len(reasoning), drop_reasoning=False)
+
+    return request
@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import logfire
+
+from .rate_limit import RateLimiter
+
+
+class RedisTokenBucket:
+    """
+    Redis 上的令牌桶, 由所有 API 副本共享
+    令牌数与更新时间保存在一个 hash 中, 补充与扣除在 Lua 脚本中原子完成, 时间取自 Redis 服务器以避免副本间时钟偏差
+    """
+    # KEYS[1]: bucket key
+    # ARGV[1]: capacity, ARGV[2]: refill per second, ARGV[3]: requested, ARGV[4]: minimum
+    # 桶中至少有 minimum 个令牌时扣除并返回 min(requested, 可用令牌数), 否则返回 0 与需要等待的秒数
+    _TAKE_SCRIPT = """
+    local time = redis.call("TIME")
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local requested = tonumber(ARGV[3])
+    local minimum = math.min(tonumber(ARGV[4]), capacity)
+
+    local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+    local granted = 0
+    local wait = 0
+    if tokens >= minimum then
+        granted = math.min(requested, math.floor(tokens))
+        tokens = tokens - granted
+    else
+        wait = (minimum - tokens) / rate
+    end
+    redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+    redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+    return {granted, tostring(wait)}
+    """
+
+    def __init__(self,
+                 key: str,
+                 capacity: int,
+                 refill_rate: float,
+                 client=None) -> None:
+        if client is None:
+            from api.redis.constants import CLIENT
+            client = CLIENT
+        self.client = client
+        self.key = key
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    async def take(self, requested: int, minimum: int) -> tuple[int, float]:
+        """
+        取出至多 requested 个令牌, 不足 minimum 个时不扣除
+        :return: (取得的令牌数, 需要等待的秒数)
+        """
+        granted, wait = await self.client.eval(self._TAKE_SCRIPT,
+                                               1,
+                                               self.key,
+                                               str(self.capacity),
+                                               str(self.refill_rate),
+                                               str(requested),
+                                               str(minimum))
+        if isinstance(wait, bytes):
+            wait = wait.decode()
+        return int(granted), float(wait)
+
+
+class LeasedBucket:
+    """
+    令牌桶的本地租约缓存
+    每次从共享的桶中租出一批令牌 (至少 lease_size 个) 在本地扣除, 用完后再访问 Redis,
+    未用完的租约在 lease_ttl 秒后作废, 避免空闲副本长期占用额度
+    """
+    def __init__(self, bucket: RedisTokenBucket, lease_size: int, lease_ttl: float = 5) -> None:
+        self.bucket = bucket
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self._balance = 0
+        self._leased_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def balance(self) -> int:
+        if self._balance > 0 and time.monotonic() - self._leased_at > self.lease_ttl:
+            self._balance = 0
+        return self._balance
+
+    async def try_acquire(self, amount: int) -> float:
+        if self.balance >= amount:
+            self._balance -= amount
+            return 0.0
+        async with self._lock:
+            # 等锁期间其他协程可能已经续租
+            if self.balance >= amount:
+                self._balance -= amount
+                return 0.0
+            lacking = amount - self.balance
+            granted, wait = await self.bucket.take(max(self.lease_size, lacking), lacking)
+            if granted == 0:
+                return wait
+            self._balance += granted
+            self._leased_at = time.monotonic()
+            self._balance -= amount
+            return 0.0
+
+    def adjust(self, amount: int) -> None:
+        """退还 (正数) 或追扣 (负数) 令牌, 余额可以为负, 由下次租约补足"""
+        self._balance += amount
+
+
+class DistributedRateLimiter(RateLimiter):
+    """
+    多副本共享的 RPM / TPM 限额
+    同一个 key 的限流器 (即同一个供应商 key) 在所有副本间共享额度, 通过本地租约减少 Redis 往返;
+    Redis 不可用时放行请求, 只记录警告
+    """
+    def __init__(self,
+                 key: str,
+                 rpm: int | None = None,
+                 tpm: int | None = None,
+                 client=None,
+                 request_lease: int = 5,
+                 token_lease: int = 5000,
+                 lease_ttl: float = 5,
+                 key_prefix: str = "rate_limit:") -> None:
+        self.key = key
+        self.requests = LeasedBucket(
+            RedisTokenBucket(f"{key_prefix}{key}:rpm", rpm, rpm / 60, client),
+            min(request_lease, rpm),
+            lease_ttl,
+        ) if rpm else None
+        self.tokens = LeasedBucket(
+            RedisTokenBucket(f"{key_prefix}{key}:tpm", tpm, tpm / 60, client),
+            min(token_lease, tpm),
+            lease_ttl,
+        ) if tpm else None
+
+    async def try_acquire(self, estimated_tokens: int = 0) -> float:
+        try:
+            if self.requests is not None:
+                wait = await self.requests.try_acquire(1)
+                if wait > 0:
+                    return wait
+            if self.tokens is not None and estimated_tokens:
+                wait = await self.tokens.try_acquire(estimated_tokens)
+                if wait > 0:
+                    # 归还已占用的请求额度
+                    if self.requests is not None:
+                        self.requests.adjust(1)
+                    return wait
+        except Exception as e:
+            logfire.warning(f"Distributed rate limiter {self.key} unavailable, request allowed: {e}")
+        return 0.0
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
@@ -0,0 +1,119 @@
+import asyncio
+
+from openai import NOT_GIVEN, NotGiven
+
+from api.llm.embedding_cache import EMBEDDING_CACHE, EmbeddingCache, embedding_cache_key
+
+from .delegate.openai import embedding_delegate_for_async_openai
+from .hedging import HedgePolicy
+from .load_balancer import LoadBalancer
+from .rate_limit import estimate_text_tokens
+
+
+def _embedding_model(load_balancer: LoadBalancer, service_name: str) -> str | None:
+    """服务所有实例共用的模型, 实例模型不一致时向量不可互换, 返回 None"""
+    models = {getattr(i, "model", None) for i in load_balancer.registry.get_instances(service_name)}
+    return models.pop() if len(models) == 1 else None
+
+
+async def embed_with_cache(load_balancer: LoadBalancer,
+                           service_name: str,
+                           texts: list[str],
+                           dimensions: int | NotGiven = NOT_GIVEN,
+                           cache: EmbeddingCache = EMBEDDING_CACHE,
+                           hedge: HedgePolicy | None = None) -> list[list[float]]:
+    """
+    带缓存的 embedding 请求, 返回的向量顺序与输入一致
+    在负载均衡之前按 (模型, 维度, 文本哈希) 查找缓存, 只有未命中的文本经负载均衡器请求,
+    命中不占用实例的限流与并发名额, 也不计入延迟统计
+    :param hedge: 对冲请求配置, 默认不对冲
+    """
+    async def _embed(misses: list[str]) -> list[list[float]]:
+        async def delegate(instance):
+            return await embedding_delegate_for_async_openai(instance, misses, dimensions)
+
+        response = await load_balancer.execute(
+            service_name,
+            delegate,
+            estimated_tokens=sum(estimate_text_tokens(t) for t in misses),
+            hedge=hedge,
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    model = _embedding_model(load_balancer, service_name)
+    if model is None:
+        return await _embed(texts)
+
+    keys = [embedding_cache_key(model, dimensions, t) for t in texts]
+    cached = await cache.get_many(keys)
+    # 相同文本只请求一次
+    misses = {key: t for key, t in zip(keys, texts) if key not in cached}
+    if misses:
+        fetched = dict(zip(misses, await _embed(list(misses.values()))))
+        await cache.set_many(fetched)
+        cached.update(fetched)
+    return [cached[key] for key in keys]
+
+
+class EmbeddingMicroBatcher:
+    """
+    合并并发的单条文本 embedding 请求
+    第一条文本到达后等待 linger 秒或凑满 max_batch_size 条, 以一次列表输入的 embeddings.create 请求,
+    再把向量按顺序分发给各个调用方
+    """
+    def __init__(self,
+                 load_balancer: LoadBalancer,
+                 service_name: str,
+                 max_batch_size: int = 10,
+                 linger: float = 0.005,
+                 dimensions: int | NotGiven = NOT_GIVEN,
+                 cache: EmbeddingCache = EMBEDDING_CACHE) -> None:
+        self.load_balancer = load_balancer
+        self.service_name = service_name
+        self.max_batch_size = max_batch_size
+        self.linger = linger
+        self.dimensions = dimensions
+        self.cache = cache
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._linger_handle: asyncio.TimerHandle | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif len(self._pending) == 1:
+            self._linger_handle = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._linger_handle is not None:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        batch = [p for p in self._pending if not p[1].cancelled()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._embed_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _embed_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        try:
+            embeddings = await embed_with_cache(
+                self.load_balancer,
+                self.service_name,
+                [text for text, _ in batch],
+                self.dimensions,
+                cache=self.cache,
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
@@ -1,8 +1,17 @@
-
 # 自定义异常类型
 class LoadBalancerError(Exception): pass
 class NoAvailableInstanceError(LoadBalancerError): pass
-class RequestTimeoutError(LoadBalancerError): pass
-class LimitExceededError(LoadBalancerError): pass
-class ServiceError(LoadBalancerError): pass
-class MaxRetriesExceededError(LoadBalancerError): pass
\ No newline at end of file
+
+class RetryableError(LoadBalancerError):
+    """可以由负载均衡器重试的错误, retry_after 为服务端要求的等待秒数 (Retry-After)"""
+    def __init__(self, *args: object, retry_after: float | None = None) -> None:
+        super().__init__(*args)
+        self.retry_after = retry_after
+
+class RequestTimeoutError(RetryableError): pass
+class LimitExceededError(RetryableError): pass
+class ServiceError(RetryableError): pass
+class MaxRetriesExceededError(LoadBalancerError): pass
+class RetryBudgetExhaustedError(MaxRetriesExceededError): pass
+class AdmissionRejectedError(LoadBalancerError): pass
+class StreamNotResumableError(LoadBalancerError): pass
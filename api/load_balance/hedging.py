@@ -0,0 +1,39 @@
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    对冲请求配置, 只应用于幂等的请求 (embedding、非流式结构化抽取等)
+    首个实例在其历史延迟的 percentile 分位内没有返回时, 向另一个实例发出相同请求, 先返回者胜出
+    """
+    percentile: float = 0.95      # 触发对冲的延迟分位
+    min_samples: int = 20         # 样本不足时不对冲, 避免预热期间的慢请求被成倍复制
+    min_delay: float = 0.05       # 对冲延迟下限(秒), 避免过早复制请求
+
+
+class LatencyWindow:
+    """实例最近若干次成功的非流式请求的延迟"""
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def hedge_delay(self, policy: HedgePolicy) -> float | None:
+        """对冲延迟, 样本不足时返回 None 表示不对冲"""
+        if len(self) < policy.min_samples:
+            return None
+        return max(policy.min_delay, self.percentile(policy.percentile))
+
+
+DEFAULT_HEDGE_POLICY = HedgePolicy()
@@ -2,11 +2,14 @@ from api.llm.deepseek import async_client as deepseek_async_client
 from api.llm.tongyi import async_client as tongyi_async_client
 
 from ..constant import (
+    CHAT_PRIORITY_CLASSES,
+    CHAT_SERVICE_MAX_CONCURRENCY,
     DEEPSEEK_REASONER_SERVICE_NAME,
     DEEPSEEK_CHAT_SERVICE_NAME,
     LOAD_BLANCER,
 )
 from ..service_instance import AsyncOpenAIServiceInstance
+from ..service_regeistry import ServiceConfig
 
 
 def register_deepseek_reasoner_service() -> None:
@@ -25,9 +28,14 @@ def register_deepseek_reasoner_service() -> None:
         name="deepseek",
         openai_client=deepseek_async_client(),
         model="deepseek-reasoner",
+        # beta 接口支持 assistant 前缀续写, 流式续传时使用
+        assistant_prefix_field="prefix",
     )
     service_reg.register_service(DEEPSEEK_REASONER_SERVICE_NAME,
                                  deepseek_offcial_instance)
+    service_reg.set_service_config(DEEPSEEK_REASONER_SERVICE_NAME,
+                                   ServiceConfig(max_concurrency=CHAT_SERVICE_MAX_CONCURRENCY,
+                                                 priority_classes=CHAT_PRIORITY_CLASSES))
 
 def register_deepseek_chat_service() -> None:
     service_reg = LOAD_BLANCER.registry
@@ -36,6 +44,13 @@ def register_deepseek_chat_service() -> None:
         name="deepseek",
         openai_client=deepseek_async_client(),
         model="deepseek-chat",
+        # 支持 JSON 模式, json_extract 可跳过重试图
+        structured_output="json_object",
+        # beta 接口支持 assistant 前缀续写, 流式续传时使用
+        assistant_prefix_field="prefix",
     )
     service_reg.register_service(DEEPSEEK_CHAT_SERVICE_NAME,
-                                 deepseek_offcial_instance)
\ No newline at end of file
+                                 deepseek_offcial_instance)
+    service_reg.set_service_config(DEEPSEEK_CHAT_SERVICE_NAME,
+                                   ServiceConfig(max_concurrency=CHAT_SERVICE_MAX_CONCURRENCY,
+                                                 priority_classes=CHAT_PRIORITY_CLASSES))
\ No newline at end of file
@@ -6,10 +6,13 @@ from ..constant import (
     QWEN_PLUS_SERVICE_NAME,
     QWEN_VL_OCR_SERVICE_NAME,
     QWEN_TEXT_EMBEDDING_SERVICE_NAME,
+    CHAT_PRIORITY_CLASSES,
+    CHAT_SERVICE_MAX_CONCURRENCY,
     LOAD_BLANCER,
     
 )
 from ..service_instance import AsyncOpenAIServiceInstance
+from ..service_regeistry import ServiceConfig
 
 
 def register_qwen_3_235b_service() -> None:
@@ -19,8 +22,13 @@ def register_qwen_3_235b_service() -> None:
         name="tongyi",
         openai_client=tongyi_async_client(),
         model="qwen3-235b-a22b",
+        # 通义以 partial 标记 assistant 前缀续写, 流式续传时使用
+        assistant_prefix_field="partial",
     )
     service_reg.register_service(QWEN_3_235B_SERVICE_NAME, tongyi_instance)
+    service_reg.set_service_config(QWEN_3_235B_SERVICE_NAME,
+                                   ServiceConfig(max_concurrency=CHAT_SERVICE_MAX_CONCURRENCY,
+                                                 priority_classes=CHAT_PRIORITY_CLASSES))
 def register_qwen_max_service() -> None:
     service_reg = LOAD_BLANCER.registry
     # tongyi service for qwen max
@@ -28,9 +36,16 @@ def register_qwen_max_service() -> None:
         name="tongyi",
         openai_client=tongyi_async_client(),
         model="qwen-max",
+        # 通义以 partial 标记 assistant 前缀续写, 流式续传时使用
+        assistant_prefix_field="partial",
+        # 支持 JSON 模式, json_extract 可跳过重试图
+        structured_output="json_object",
     )
     service_reg.register_service(QWEN_MAX_SERVICE_NAME,
                                  tongyi_instance)
+    service_reg.set_service_config(QWEN_MAX_SERVICE_NAME,
+                                   ServiceConfig(max_concurrency=CHAT_SERVICE_MAX_CONCURRENCY,
+                                                 priority_classes=CHAT_PRIORITY_CLASSES))
     
 def register_qwen_plus_service() -> None:
     service_reg = LOAD_BLANCER.registry
@@ -39,11 +54,18 @@ def register_qwen_plus_service() -> None:
         name="tongyi",
         openai_client=tongyi_async_client(),
         model="qwen-plus",
+        # 通义以 partial 标记 assistant 前缀续写, 流式续传时使用
+        assistant_prefix_field="partial",
+        # 支持 JSON 模式, json_extract 可跳过重试图
+        structured_output="json_object",
     )
     service_reg.register_service(
         QWEN_PLUS_SERVICE_NAME,
         tongyi_instance,
     )
+    service_reg.set_service_config(QWEN_PLUS_SERVICE_NAME,
+                                   ServiceConfig(max_concurrency=CHAT_SERVICE_MAX_CONCURRENCY,
+                                                 priority_classes=CHAT_PRIORITY_CLASSES))
 
 def register_qwen_vl_ocr_service() -> None:
     service_reg = LOAD_BLANCER.registry
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import math
 import random
 import time
 import requests
@@ -7,11 +8,34 @@ from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 from .service_instance import ServiceInstanceBase
 
 class LoadBalanceStrategy(ABC):
-    """负载均衡策略抽象基类"""
+    """
+    负载均衡策略抽象基类
+    策略实例按服务保存在 ServiceRegistry 中, 跨请求保持状态
+    """
     @abstractmethod
     def select_instance(self, instances: List[ServiceInstanceBase]) -> ServiceInstanceBase:
         pass
 
+    def on_request_start(self, instance: ServiceInstanceBase) -> None:
+        """请求发往实例前调用, 与 select_instance 之间没有 await"""
+
+    def on_request_abandoned(self, instance: ServiceInstanceBase) -> None:
+        """已调用 on_request_start 的请求在发出前被放弃 (如实例限流), 撤销其计数"""
+
+    def on_request_end(
+        self,
+        instance: ServiceInstanceBase,
+        latency: float,
+        succeeded: bool,
+        streamed: bool,
+    ) -> None:
+        """
+        请求结束后调用 (无论成功或失败), 流式请求在流被消费完或关闭时才调用
+        :param latency: 请求函数的耗时(秒), 流式请求为收到响应头 (约等于首 token) 的耗时
+        :param succeeded: 请求是否成功, 流式请求为流是否正常结束
+        :param streamed: 结果是否为流式响应
+        """
+
 class RandomStrategy(LoadBalanceStrategy):
     """随机选择策略"""
     def select_instance(self, instances: List[ServiceInstanceBase]) -> ServiceInstanceBase:
@@ -23,8 +47,106 @@ class RoundRobinStrategy(LoadBalanceStrategy):
         self._index = 0
     
     def select_instance(self, instances: List[ServiceInstanceBase]) -> ServiceInstanceBase:
-        instance = instances[self._index]
+        # 实例列表可能在运行中增长, 取模避免越界
+        instance = instances[self._index % len(instances)]
         self._index += 1
         if self._index >= len(instances):
             self._index = 0
-        return instance
\ No newline at end of file
+        return instance
+
+class LeastOutstandingRequestsStrategy(LoadBalanceStrategy):
+    """
+    最少在途请求策略
+    选择当前在途请求数最少的实例, 数量相同时随机选择
+    计数只在事件循环线程中修改, 选择与计数之间没有 await, 因此在 asyncio 并发下是安全的
+    """
+    def __init__(self):
+        self._outstanding: dict[ServiceInstanceBase, int] = {}
+
+    def outstanding(self, instance: ServiceInstanceBase) -> int:
+        return self._outstanding.get(instance, 0)
+
+    def select_instance(self, instances: List[ServiceInstanceBase]) -> ServiceInstanceBase:
+        least = min(self.outstanding(i) for i in instances)
+        return random.choice([i for i in instances if self.outstanding(i) == least])
+
+    def on_request_start(self, instance: ServiceInstanceBase) -> None:
+        self._outstanding[instance] = self.outstanding(instance) + 1
+
+    def on_request_abandoned(self, instance: ServiceInstanceBase) -> None:
+        self._decrement(instance)
+
+    def on_request_end(
+        self,
+        instance: ServiceInstanceBase,
+        latency: float,
+        succeeded: bool,
+        streamed: bool,
+    ) -> None:
+        self._decrement(instance)
+
+    def _decrement(self, instance: ServiceInstanceBase) -> None:
+        count = self.outstanding(instance) - 1
+        if count > 0:
+            self._outstanding[instance] = count
+        else:
+            self._outstanding.pop(instance, None)
+
+class PeakEwmaStrategy(LeastOutstandingRequestsStrategy):
+    """
+    延迟感知策略 (EWMA + power of two choices)
+    按实例分别维护首 token 延迟 (流式) 与总延迟 (非流式) 的指数加权移动平均,
+    随机取两个实例, 选择 预估延迟 * (在途请求数 + 1) 较小的一个
+    平均值按时间衰减 (半衰期约 decay_time * ln2), 延迟突增时立即取峰值, 使变慢的实例迅速降权
+    """
+    def __init__(
+        self,
+        decay_time: float = 10,         # 衰减时间常数(秒)
+        failure_penalty: float = 30,    # 失败请求按该延迟(秒)计入
+    ):
+        super().__init__()
+        self.decay_time = decay_time
+        self.failure_penalty = failure_penalty
+        # instance -> (ewma, 更新时间)
+        self._ttft: dict[ServiceInstanceBase, tuple[float, float]] = {}
+        self._latency: dict[ServiceInstanceBase, tuple[float, float]] = {}
+
+    def _ewma(self, table: dict[ServiceInstanceBase, tuple[float, float]],
+              instance: ServiceInstanceBase) -> float | None:
+        entry = table.get(instance)
+        return entry[0] if entry else None
+
+    def estimated_latency(self, instance: ServiceInstanceBase) -> float:
+        """实例的预估延迟, 取已观测的首 token 延迟与总延迟的均值, 未观测的实例为 0 以便优先探索"""
+        observed = [v for v in (self._ewma(self._ttft, instance), self._ewma(self._latency, instance))
+                    if v is not None]
+        return sum(observed) / len(observed) if observed else 0.0
+
+    def score(self, instance: ServiceInstanceBase) -> float:
+        return self.estimated_latency(instance) * (self.outstanding(instance) + 1)
+
+    def select_instance(self, instances: List[ServiceInstanceBase]) -> ServiceInstanceBase:
+        if len(instances) == 1:
+            return instances[0]
+        first, second = random.sample(instances, 2)
+        return first if self.score(first) <= self.score(second) else second
+
+    def on_request_end(
+        self,
+        instance: ServiceInstanceBase,
+        latency: float,
+        succeeded: bool,
+        streamed: bool,
+    ) -> None:
+        super().on_request_end(instance, latency, succeeded, streamed)
+        if not succeeded:
+            latency = max(latency, self.failure_penalty)
+        table = self._ttft if streamed else self._latency
+        now = time.monotonic()
+        entry = table.get(instance)
+        if entry is None or latency > entry[0]:
+            table[instance] = (latency, now)
+            return
+        ewma, updated_at = entry
+        alpha = 1 - math.exp(-(now - updated_at) / self.decay_time)
+        table[instance] = (ewma + alpha * (latency - ewma), now)
@@ -1,17 +1,27 @@
 from math import sqrt
+import random
 import time
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
 from typing import Any, Awaitable
 
 import asyncio
+import httpx
+import logfire
+import openai
 from .exception import (
     MaxRetriesExceededError,
     NoAvailableInstanceError,
     RequestTimeoutError,
     LimitExceededError,
+    RetryableError,
+    RetryBudgetExhaustedError,
     ServiceError,
 )
+from .adaptive_concurrency import AdaptiveConcurrencyLimiter
+from .admission import REQUEST_PRIORITY, Priority
+from .hedging import HedgePolicy
 from .load_balance_strategy import LoadBalanceStrategy, RoundRobinStrategy
+from .rate_limit import RateLimiter, usage_total_tokens
 from .service_instance import ServiceInstanceBase
 from .service_regeistry import ServiceConfig, ServiceRegistry
 
@@ -19,6 +29,53 @@ from typing import Generic, TypeVar
 
 T = TypeVar("T")
 
+# 流式响应中途断开时可以切换实例续传的错误
+STREAM_RESUMABLE_ERRORS: tuple[type[BaseException], ...] = (
+    RetryableError,
+    openai.APIError,
+    httpx.TransportError,
+)
+
+
+def _is_final_chunk(chunk: Any) -> bool:
+    """分块是否带有 finish_reason, 即模型已完成生成"""
+    return any(getattr(choice, "finish_reason", None) for choice in getattr(chunk, "choices", None) or ())
+
+
+async def _release_when_consumed(stream: AsyncIterator[Any], release: Callable[[bool], None]) -> AsyncIterator[Any]:
+    """
+    流式响应在被消费完 (或中断) 后才归还名额
+    release 的参数表示流是否正常结束, 调用方提前关闭流也视为正常结束
+    """
+    completed = False
+    try:
+        async for chunk in stream:
+            yield chunk
+        completed = True
+    except (GeneratorExit, asyncio.CancelledError):
+        completed = True
+        raise
+    finally:
+        release(completed)
+
+
+async def _reconcile_stream_usage(stream: AsyncIterator[Any],
+                                  rate_limiter: RateLimiter,
+                                  estimated_tokens: int) -> AsyncIterator[Any]:
+    """
+    流结束时按分块中的 usage (stream_options.include_usage 时最后一个分块带有) 校正预扣的 token
+    没有 usage 的流 (如中途断开) 保留预估值
+    """
+    actual_tokens = None
+    try:
+        async for chunk in stream:
+            actual_tokens = usage_total_tokens(chunk) or actual_tokens
+            yield chunk
+    finally:
+        if actual_tokens is not None:
+            rate_limiter.reconcile(estimated_tokens, actual_tokens)
+
+
 class LoadBalancer:
     """负载均衡核心控制器"""
 
@@ -34,12 +91,20 @@ class LoadBalancer:
         service_name: str,
         request_func: Callable[[ServiceInstanceBase], Awaitable[T]],
         override_config: ServiceConfig | None = None,
+        estimated_tokens: int = 0,
+        hedge: HedgePolicy | None = None,
+        priority: Priority | None = None,
+        avoid: ServiceInstanceBase | None = None,
     ) -> T:
         """
         执行负载均衡请求
         :param service_name: 注册的服务名称
         :param request_func: 实际请求的函数 (接受ServiceInstance参数)
         :param override_config: 可覆盖的配置
+        :param estimated_tokens: 预估的 token 消耗, 用于实例的 TPM 限流, 见 rate_limit.estimate_message_tokens
+        :param hedge: 对冲请求配置, 只能用于幂等的非流式请求
+        :param priority: 请求优先级, 默认取自上下文 REQUEST_PRIORITY, 服务配置了 max_concurrency 时生效
+        :param avoid: 有其他可用实例时不选择该实例
         :return: 请求结果
         """
         instances = self.registry.get_instances(service_name)
@@ -48,20 +113,320 @@ class LoadBalancer:
             raise NoAvailableInstanceError(msg)
 
         config = override_config or self.registry.get_config(service_name)
-        strategy = self.strategy_type()
+        strategy = self.registry.get_strategy(service_name, self.strategy_type)
+        admission = self.registry.get_admission_controller(service_name)
+        if priority is None:
+            priority = REQUEST_PRIORITY.get()
+        retry_budget = self.registry.get_retry_budget(service_name)
+        retry_budget.record_request()
 
         last_exception = None
+        # 重试时优先换一个实例
+        failed_instance = avoid
         for attempt in range(config.max_retries + 1):
-            instance = strategy.select_instance(instances)
+            release = None
+            if admission is not None:
+                await admission.acquire(priority)
+                release = lambda *_: admission.release(priority)  # noqa: E731
             try:
-                return await request_func(instance)
-            except (RequestTimeoutError, ServiceError, LimitExceededError) as e:
+                instance = await self._acquire_instance(strategy, instances, estimated_tokens, failed_instance)
+                if hedge is None:
+                    result = await self._attempt(strategy, instance, request_func, estimated_tokens)
+                else:
+                    result = await self._hedged_attempt(
+                        strategy, instances, instance, request_func, estimated_tokens, hedge)
+                if release is not None and hasattr(result, "__aiter__"):
+                    result, release = _release_when_consumed(result, release), None
+                return result
+            except RetryableError as e:
                 last_exception = e
-                if attempt < config.max_retries:
-                    delay = config.retry_delay * (config.retry_backoff**sqrt(attempt))
-                    await asyncio.sleep(delay)
-            except Exception as e:
-                raise e
+                failed_instance = instance
+                if e.retry_after:
+                    # 服务端要求的等待只针对该实例, 其他实例仍可接收重试
+                    self.registry.set_cooldown(instance, e.retry_after)
+            finally:
+                if release is not None:
+                    release()
+
+            # 退避等待不计入实例的在途请求
+            if attempt < config.max_retries:
+                if not retry_budget.try_withdraw():
+                    msg = f"Retry budget exhausted for {service_name}"
+                    raise RetryBudgetExhaustedError(msg) from last_exception
+                # full jitter, 避免大量请求在同一时刻重试
+                delay = random.uniform(0, config.retry_delay * (config.retry_backoff**sqrt(attempt)))
+                await asyncio.sleep(delay)
 
         msg = f"Max retries exceeded for {service_name}"
-        raise MaxRetriesExceededError(msg) from last_exception
\ No newline at end of file
+        raise MaxRetriesExceededError(msg) from last_exception
+
+    async def execute_stream(
+        self,
+        service_name: str,
+        request_func: Callable[[ServiceInstanceBase, list[T]], Awaitable[AsyncIterator[T]]],
+        max_failovers: int = 2,
+        **kwargs: Any,
+    ) -> AsyncIterator[T]:
+        """
+        执行可续传的流式请求
+        流在中途断开时, 以已转发的分块重新调用 request_func, 由其向另一个实例发出续传请求,
+        request_func 返回的流只应包含尚未转发的内容, 因此调用方不会收到重复的分块
+        :param request_func: 实际请求的函数, 接受 ServiceInstance 与已转发的分块, 返回流
+        :param max_failovers: 最多续传次数
+        :param kwargs: 传给 execute 的其他参数
+        """
+        forwarded: list[T] = []
+        failovers = 0
+        # 已转发带 finish_reason 的分块后生成已完成, 之后的断开 (如 usage 分块或 [DONE] 之前) 不再续传
+        finished = False
+        while True:
+            served_by: ServiceInstanceBase | None = None
+
+            async def _request(instance: ServiceInstanceBase) -> AsyncIterator[T]:
+                nonlocal served_by
+                served_by = instance
+                return await request_func(instance, list(forwarded))
+
+            stream = await self.execute(service_name, _request, **kwargs)
+            try:
+                async for chunk in stream:
+                    forwarded.append(chunk)
+                    finished = finished or _is_final_chunk(chunk)
+                    yield chunk
+                return
+            except STREAM_RESUMABLE_ERRORS as e:
+                if finished:
+                    logfire.warning(f"Stream of {service_name} broken after its final chunk, ended normally: {e!r}")
+                    return
+                if failovers >= max_failovers:
+                    raise
+                failovers += 1
+                logfire.warning(f"Stream of {service_name} broken after {len(forwarded)} chunks, "
+                                f"failover {failovers}/{max_failovers}: {e!r}")
+                if served_by is not None:
+                    self.registry.get_circuit_breaker(served_by).record_failure()
+                kwargs["avoid"] = served_by
+
+    async def _attempt(
+        self,
+        strategy: LoadBalanceStrategy,
+        instance: ServiceInstanceBase,
+        request_func: Callable[[ServiceInstanceBase], Awaitable[T]],
+        estimated_tokens: int,
+    ) -> T:
+        """
+        向已选定并占用限额的实例发送一次请求, 并更新熔断器、策略、并发上限与延迟统计
+        实例的策略计数、熔断探测名额与并发名额已在 _try_acquire_instance 中占用
+        """
+        breaker = self.registry.get_circuit_breaker(instance)
+        started_at = time.monotonic()
+        succeeded, streamed, dropped, cancelled = False, False, False, False
+        try:
+            result = await request_func(instance)
+            succeeded = True
+            breaker.record_success()
+            if hasattr(result, "__aiter__"):
+                # 流式响应在消费完或关闭前仍是实例的在途请求, 延迟按首 token 计入
+                ttft = time.monotonic() - started_at
+                streamed = True
+                if instance.rate_limiter is not None:
+                    result = _reconcile_stream_usage(result, instance.rate_limiter, estimated_tokens)
+                return _release_when_consumed(
+                    result,
+                    lambda completed: self._finish_request(strategy, instance, ttft, completed, streamed=True),
+                )
+            self.registry.get_latency_window(instance).record(time.monotonic() - started_at)
+            actual_tokens = usage_total_tokens(result)
+            if instance.rate_limiter is not None and actual_tokens is not None:
+                instance.rate_limiter.reconcile(estimated_tokens, actual_tokens)
+            return result
+        except (RequestTimeoutError, ServiceError) as e:
+            breaker.record_failure()
+            dropped = isinstance(e, RequestTimeoutError)
+            raise
+        except LimitExceededError:
+            breaker.record_ignored()
+            dropped = True
+            raise
+        except asyncio.CancelledError:
+            breaker.record_ignored()
+            cancelled = True
+            raise
+        except BaseException:
+            breaker.record_ignored()
+            raise
+        finally:
+            if not streamed:
+                self._finish_request(strategy, instance, time.monotonic() - started_at,
+                                     succeeded, streamed=False, dropped=dropped, cancelled=cancelled)
+
+    @staticmethod
+    def _finish_request(
+        strategy: LoadBalanceStrategy,
+        instance: ServiceInstanceBase,
+        latency: float,
+        succeeded: bool,
+        streamed: bool,
+        dropped: bool = False,
+        cancelled: bool = False,
+    ) -> None:
+        """归还 _try_acquire_instance 中占用的策略计数与并发名额, 流式请求在流结束时调用"""
+        # 被取消的请求 (如对冲中落败的一方) 不视为失败, 按已耗时计入
+        strategy.on_request_end(instance, latency, succeeded or cancelled, streamed)
+        if instance.concurrency_limiter is not None:
+            instance.concurrency_limiter.on_request_end(dropped, succeeded)
+
+    async def _hedged_attempt(
+        self,
+        strategy: LoadBalanceStrategy,
+        instances: list[ServiceInstanceBase],
+        instance: ServiceInstanceBase,
+        request_func: Callable[[ServiceInstanceBase], Awaitable[T]],
+        estimated_tokens: int,
+        hedge: HedgePolicy,
+    ) -> T:
+        """
+        首个实例在对冲延迟内没有返回时, 向另一个可用实例发出相同请求
+        先成功返回的结果胜出, 另一个请求被取消; 两者都失败时抛出最后一个异常
+        实例的延迟样本不足 hedge.min_samples 时不对冲
+        """
+        delay = self.registry.get_latency_window(instance).hedge_delay(hedge)
+        if delay is None:
+            return await self._attempt(strategy, instance, request_func, estimated_tokens)
+        tasks = {asyncio.ensure_future(self._attempt(strategy, instance, request_func, estimated_tokens))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                others = [i for i in instances if i is not instance]
+                backup = await self._try_acquire_instance(strategy, others, estimated_tokens) if others else None
+                if isinstance(backup, ServiceInstanceBase):
+                    tasks.add(asyncio.ensure_future(
+                        self._attempt(strategy, backup, request_func, estimated_tokens)))
+
+            last_exception: BaseException | None = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_exception = task.exception()
+            raise last_exception
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # 所有实例熔断时重新检查的最短间隔(秒)
+    ALL_OPEN_POLL_INTERVAL = 0.1
+    # 排队等待并发名额时重新检查其他实例 (熔断恢复、冷却结束) 的间隔(秒)
+    SATURATED_RECHECK_INTERVAL = 1.0
+
+    async def _try_acquire_instance(
+        self,
+        strategy: LoadBalanceStrategy,
+        instances: list[ServiceInstanceBase],
+        estimated_tokens: int,
+        avoid: ServiceInstanceBase | None = None,
+        reserved: bool = False,
+    ) -> ServiceInstanceBase | float | None:
+        """
+        选择实例并占用其限额, 没有可用实例时返回需要等待的秒数, 可用实例的并发均已满时返回 None
+        跳过已熔断或处于 Retry-After 冷却中的实例, 有其他实例时跳过 avoid (上次失败的实例);
+        策略选中的实例并发已满或没有限额时改选其他实例
+        策略计数、熔断探测名额与并发名额在 await 限流器之前占用, 使并发的选择能看到本次请求, 限流拒绝时撤销
+        :param reserved: 请求排队后被唤醒, 持有保留的并发名额, 不受排队中的其他请求限制
+        """
+        breakers = {i: self.registry.get_circuit_breaker(i) for i in instances}
+        cooldowns = {i: self.registry.cooldown_remaining(i) for i in instances}
+        healthy = [i for i in instances if breakers[i].available() and cooldowns[i] == 0]
+        if not healthy:
+            # 所有实例均已熔断或在冷却中, 等到最早可用的时候
+            wait = min(max(breakers[i].retry_after(), cooldowns[i]) for i in instances)
+            return max(wait, self.ALL_OPEN_POLL_INTERVAL)
+        if avoid in healthy and len(healthy) > 1:
+            healthy.remove(avoid)
+
+        selected = strategy.select_instance(healthy)
+        waits: list[float] = []
+        saturated = False
+        for instance in [selected, *(i for i in healthy if i is not selected)]:
+            limiter = instance.concurrency_limiter
+            if limiter is not None and not limiter.has_capacity(reserved):
+                saturated = True
+                continue
+            breaker = breakers[instance]
+            # 之前候选实例的限流检查有 await, 期间半开的探测名额可能已被占用
+            if not breaker.available():
+                continue
+            breaker.on_request_start()
+            strategy.on_request_start(instance)
+            if limiter is not None:
+                limiter.on_request_start()
+            if instance.rate_limiter is not None:
+                try:
+                    wait = await instance.rate_limiter.try_acquire(estimated_tokens)
+                except BaseException:
+                    self._abandon_request(strategy, instance)
+                    raise
+                if wait > 0:
+                    self._abandon_request(strategy, instance)
+                    waits.append(wait)
+                    continue
+            return instance
+        if waits:
+            return min(waits)
+        return None if saturated else self.ALL_OPEN_POLL_INTERVAL
+
+    def _abandon_request(self, strategy: LoadBalanceStrategy, instance: ServiceInstanceBase) -> None:
+        """撤销 _try_acquire_instance 为未发出的请求占用的名额"""
+        self.registry.get_circuit_breaker(instance).record_ignored()
+        strategy.on_request_abandoned(instance)
+        if instance.concurrency_limiter is not None:
+            instance.concurrency_limiter.on_request_abandoned()
+
+    async def _acquire_instance(
+        self,
+        strategy: LoadBalanceStrategy,
+        instances: list[ServiceInstanceBase],
+        estimated_tokens: int,
+        avoid: ServiceInstanceBase | None = None,
+    ) -> ServiceInstanceBase:
+        """选择实例并占用其限额, 没有可用实例时等待最早恢复的实例, 并发均已满时排队等待名额"""
+        queued = False
+        reserved: list[AdaptiveConcurrencyLimiter] = []
+        while True:
+            try:
+                acquired = await self._try_acquire_instance(
+                    strategy, instances, estimated_tokens, avoid, reserved=bool(reserved))
+            finally:
+                for limiter in reserved:
+                    limiter.release_reservation()
+            reserved = []
+            if isinstance(acquired, ServiceInstanceBase):
+                return acquired
+            if acquired is None:
+                # 被他人抢先的请求回到队首
+                reserved = await self._wait_for_capacity(instances, first=queued)
+                queued = True
+            else:
+                await asyncio.sleep(acquired)
+
+    async def _wait_for_capacity(
+        self,
+        instances: list[ServiceInstanceBase],
+        first: bool,
+    ) -> list[AdaptiveConcurrencyLimiter]:
+        """在所有实例的并发队列中排队, 任一实例有名额时返回为本请求保留了名额的并发上限"""
+        waiters = {
+            instance.concurrency_limiter: instance.concurrency_limiter.wait_for_capacity(first)
+            for instance in instances if instance.concurrency_limiter is not None
+        }
+        try:
+            await asyncio.wait(waiters.values(), timeout=self.SATURATED_RECHECK_INTERVAL,
+                               return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            for limiter, waiter in waiters.items():
+                if limiter.cancel_wait(waiter):
+                    limiter.release_reservation()
+            raise
+        return [limiter for limiter, waiter in waiters.items() if limiter.cancel_wait(waiter)]
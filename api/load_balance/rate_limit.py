@@ -0,0 +1,124 @@
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from typing import Any
+
+
+class TokenBucket:
+    """
+    令牌桶
+    容量为 capacity, 每秒补充 refill_rate 个令牌; 令牌数允许为负, 表示按实际用量追加的欠账
+    """
+    def __init__(self, capacity: float, refill_rate: float) -> None:
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """距离桶中有 amount 个令牌还需等待的秒数, 超过容量的请求按容量计算"""
+        amount = min(amount, self.capacity)
+        lacking = amount - self.tokens
+        if lacking <= 0:
+            return 0.0
+        return lacking / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self._tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter(ABC):
+    """服务实例限流器接口"""
+    @abstractmethod
+    async def try_acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        有余量时预扣一个请求和 estimated_tokens 个 token 并返回 0,
+        否则不扣除, 返回需要等待的秒数
+        """
+
+    @abstractmethod
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """按实际用量校正预扣的 token"""
+
+
+class InstanceRateLimiter(RateLimiter):
+    """
+    单个服务实例的 RPM / TPM 限额 (进程内)
+    TPM 按预估 token 数预扣, 请求完成后按 usage 中的实际用量校正
+    """
+    def __init__(self, rpm: int | None = None, tpm: int | None = None) -> None:
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+
+    async def try_acquire(self, estimated_tokens: int = 0) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens))
+        if wait > 0:
+            return wait
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.consume(estimated_tokens)
+        return 0.0
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is None:
+            return
+        diff = estimated_tokens - actual_tokens
+        if diff > 0:
+            self.tokens.refund(diff)
+        elif diff < 0:
+            self.tokens.consume(-diff)
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    粗略估计文本的 token 数
+    ASCII 字符约 4 个一个 token, 其他字符 (中文等) 约一个字符一个 token
+    """
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def estimate_message_tokens(messages: Iterable[Any], max_tokens: int | None = None) -> int:
+    """
+    估计一次生成请求的 token 消耗: 消息内容 + 每条消息的格式开销 + 预期输出
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, str):
+            total += estimate_text_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and isinstance(part.get("text"), str):
+                    total += estimate_text_tokens(part["text"])
+        total += 4
+    return total + (max_tokens or 0)
+
+
+def usage_total_tokens(result: Any) -> int | None:
+    """从响应的 usage 中读取实际 token 用量, 流式响应等没有 usage 时返回 None"""
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
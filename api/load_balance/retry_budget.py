@@ -0,0 +1,39 @@
+import time
+from collections import deque
+
+
+class RetryBudget:
+    """
+    服务级重试预算
+    最近 window 秒内的重试次数不超过 请求数 * ratio + min_retries_per_second * window,
+    故障期间重试量随正常流量等比例受限, 避免重试风暴; 低流量时保留少量重试额度
+    """
+    def __init__(self,
+                 ratio: float = 0.2,
+                 min_retries_per_second: float = 1,
+                 window: float = 10) -> None:
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    def _expire(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        self._requests.append(now)
+
+    def try_withdraw(self) -> bool:
+        """预算允许时记录一次重试并返回 True"""
+        now = time.monotonic()
+        self._expire(now)
+        allowed = len(self._requests) * self.ratio + self.min_retries_per_second * self.window
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
@@ -2,12 +2,30 @@ from typing import Any
 
 from openai import AsyncOpenAI
 
+from .adaptive_concurrency import AdaptiveConcurrencyLimiter
+from .rate_limit import InstanceRateLimiter, RateLimiter
+
 
 class ServiceInstanceBase:
     """外部服务实例表示"""
-    def __init__(self, name: str, **kwargs: dict[str, Any]) -> None:
+    def __init__(self, name: str,
+                 rpm: int | None = None,
+                 tpm: int | None = None,
+                 rate_limiter: RateLimiter | None = None,
+                 concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+                 **kwargs: dict[str, Any]) -> None:
+        """
+        :param rpm: 每分钟请求数上限, None 表示不限制
+        :param tpm: 每分钟 token 数上限, None 表示不限制
+        :param rate_limiter: 自定义限流器 (如多副本共享的 DistributedRateLimiter), 设置时忽略 rpm / tpm
+        :param concurrency_limiter: 自适应并发上限, None 表示不限制并发
+        """
         self.name = name
         self.meta_data: dict[str, Any] = kwargs if kwargs else {}
+        if rate_limiter is None and (rpm or tpm):
+            rate_limiter = InstanceRateLimiter(rpm, tpm)
+        self.rate_limiter: RateLimiter | None = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
 
 class AsyncOpenAIServiceInstance(ServiceInstanceBase):
     def __init__(self, name: str,
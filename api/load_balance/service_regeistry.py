@@ -4,6 +4,11 @@ import time
 import requests
 from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
+from .admission import AdmissionController, PriorityClassConfig, Priority
+from .circuit_breaker import CircuitBreaker
+from .hedging import LatencyWindow
+from .load_balance_strategy import LoadBalanceStrategy
+from .retry_budget import RetryBudget
 from .service_instance import ServiceInstanceBase
 
 
@@ -14,22 +19,44 @@ class ServiceConfig:
         max_retries: int = 100,            # 默认最大重试次数
         retry_delay: float = 2,        # 重试基础延迟(秒)
         retry_backoff: float = 1.1,      # 退避因子
+        max_concurrency: int | None = None,    # 服务最大并发请求数, None 表示不做准入控制
+        priority_classes: dict[Priority, PriorityClassConfig] | None = None,  # 各优先级的并发份额与排队限制
+        retry_budget_ratio: float = 0.2,       # 重试次数占请求数的比例上限
+        retry_budget_min_per_second: float = 1,  # 低流量时每秒保留的重试次数
     ):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.retry_backoff = retry_backoff
+        self.max_concurrency = max_concurrency
+        self.priority_classes = priority_classes
+        self.retry_budget_ratio = retry_budget_ratio
+        self.retry_budget_min_per_second = retry_budget_min_per_second
 
 class ServiceRegistry:
     """服务注册中心"""
     def __init__(self):
         self._services: dict[str, list[ServiceInstanceBase]] = {}
         self._configs: dict[str, ServiceConfig] = {}
+        # 每个服务持有一个策略实例, 使轮询位置、在途计数等状态跨请求保留
+        self._strategies: dict[str, LoadBalanceStrategy] = {}
+        # 每个实例的熔断器
+        self._circuit_breakers: dict[ServiceInstanceBase, CircuitBreaker] = {}
+        # 每个实例最近的非流式请求延迟, 用于计算对冲延迟
+        self._latency_windows: dict[ServiceInstanceBase, LatencyWindow] = {}
+        # 每个服务的优先级准入控制
+        self._admission_controllers: dict[str, AdmissionController] = {}
+        # 每个服务的重试预算
+        self._retry_budgets: dict[str, RetryBudget] = {}
+        # 实例按 Retry-After 暂停接收请求的截止时间 (time.monotonic)
+        self._cooldowns: dict[ServiceInstanceBase, float] = {}
     
     def register_service(
         self,
         service_name: str,
         instance: ServiceInstanceBase,
+        circuit_breaker: CircuitBreaker | None = None,
     ):
+        self._circuit_breakers[instance] = circuit_breaker or CircuitBreaker()
         if service_name in self._services:
             self._services[service_name].append(instance)
         else:
@@ -43,10 +70,78 @@ class ServiceRegistry:
         config: ServiceConfig,
     ):
         self._configs[service_name] = config
+        self._admission_controllers.pop(service_name, None)
+        self._retry_budgets.pop(service_name, None)
+
+    def set_service_strategy(
+        self,
+        service_name: str,
+        strategy: LoadBalanceStrategy,
+    ):
+        self._strategies[service_name] = strategy
+
+    def get_strategy(
+        self,
+        service_name: str,
+        default_type: type[LoadBalanceStrategy],
+    ) -> LoadBalanceStrategy:
+        """获取服务的策略实例, 未设置时以 default_type 创建并保存"""
+        strategy = self._strategies.get(service_name)
+        if strategy is None:
+            strategy = default_type()
+            self._strategies[service_name] = strategy
+        return strategy
 
     def get_instances(self, service_name: str) -> list[ServiceInstanceBase]:
         return self._services.get(service_name, [])
     
+    def get_circuit_breaker(self, instance: ServiceInstanceBase) -> CircuitBreaker:
+        breaker = self._circuit_breakers.get(instance)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            self._circuit_breakers[instance] = breaker
+        return breaker
+
+    def get_latency_window(self, instance: ServiceInstanceBase) -> LatencyWindow:
+        window = self._latency_windows.get(instance)
+        if window is None:
+            window = LatencyWindow()
+            self._latency_windows[instance] = window
+        return window
+
+    def get_admission_controller(self, service_name: str) -> AdmissionController | None:
+        """按服务配置的 max_concurrency 创建准入控制器, 未配置时返回 None"""
+        controller = self._admission_controllers.get(service_name)
+        if controller is None:
+            config = self.get_config(service_name)
+            if config.max_concurrency is None:
+                return None
+            controller = AdmissionController(config.max_concurrency, config.priority_classes)
+            self._admission_controllers[service_name] = controller
+        return controller
+
+    def get_retry_budget(self, service_name: str) -> RetryBudget:
+        budget = self._retry_budgets.get(service_name)
+        if budget is None:
+            config = self.get_config(service_name)
+            budget = RetryBudget(config.retry_budget_ratio, config.retry_budget_min_per_second)
+            self._retry_budgets[service_name] = budget
+        return budget
+
+    def set_cooldown(self, instance: ServiceInstanceBase, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        self._cooldowns[instance] = max(until, self._cooldowns.get(instance, 0.0))
+
+    def cooldown_remaining(self, instance: ServiceInstanceBase) -> float:
+        until = self._cooldowns.get(instance)
+        if until is None:
+            return 0.0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del self._cooldowns[instance]
+            return 0.0
+        return remaining
+
     def get_config(self, service_name: str) -> ServiceConfig:
         return self._configs.get(service_name, ServiceConfig())
 
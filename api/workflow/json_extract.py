@@ -1,5 +1,7 @@
 import json
+from collections.abc import Callable
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, TypeVar
 
 from pydantic import BaseModel, ValidationError
@@ -8,12 +10,20 @@ from openai.types.chat import (
     ChatCompletionUserMessageParam
 )
 
-from api.graph_executor import Graph
+from api.graph_executor import Graph, MemoBackend
 from api.graph_executor.graph_core import BypassSignal
 from api.workflow.jinja_prompt_template import JINJA_ENV, AvailableTemplates
 from api.load_balance.delegate.openai import generation_delegate_for_async_openai
 from api.llm.generator import DEFAULT_RETRY_CONFIG
+from api.llm.response_cache import ResponseCache, make_response_cache_key
 from api.load_balance import LOAD_BLANCER
+from api.load_balance.admission import Priority
+from api.load_balance.hedging import DEFAULT_HEDGE_POLICY
+from api.load_balance.rate_limit import estimate_message_tokens
+from api.load_balance.service_instance import ServiceInstanceBase
+
+# 抽取提示词是确定性的, 相同文档与 schema 的请求 (含并发请求) 复用同一响应, 见 _generate
+RESPONSE_CACHE = ResponseCache()
 
 
 def resolve_refs_and_remove_defs(schema: dict[str, Any]) -> dict[str, Any]:
@@ -69,7 +79,118 @@ def resolve_refs_and_remove_defs(schema: dict[str, Any]) -> dict[str, Any]:
     return resolved_schema
 
 
-@Graph("json_extract")
+@lru_cache(maxsize=None)
+def resolved_json_schema(json_schema: type[BaseModel]) -> tuple[dict[str, Any], str]:
+    """
+    按模型类缓存解析后的JSON Schema, 避免每次抽取都重新生成与展开
+
+    Returns:
+        (解析后的schema字典, 用于提示词的schema字符串), 字典为共享对象, 调用方不得修改
+    """
+    json_schema_dict = resolve_refs_and_remove_defs(json_schema.model_json_schema())
+    return json_schema_dict, json.dumps(json_schema_dict, indent=2, ensure_ascii=False)
+
+
+def structured_output_response_format(
+    service_instance: ServiceInstanceBase,
+    json_schema: type[BaseModel],
+) -> dict[str, Any] | None:
+    """
+    根据实例 meta_data 的 structured_output 声明构造原生结构化输出的 response_format
+
+    - "json_schema": 将解析后的schema随请求下发, 由服务端约束输出
+    - "json_object": JSON 模式, 仅保证输出为合法JSON, schema 仍由提示词给出
+    - 未声明: 返回 None, 表示实例不支持原生结构化输出
+    """
+    mode = service_instance.meta_data.get("structured_output")
+    if mode == "json_schema":
+        json_schema_dict, _ = resolved_json_schema(json_schema)
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": json_schema.__name__, "schema": json_schema_dict},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def _supports_structured_output(llm_service_name: str) -> bool:
+    instances = LOAD_BLANCER.registry.get_instances(llm_service_name)
+    return bool(instances) and all(
+        instance.meta_data.get("structured_output") in ("json_schema", "json_object")
+        for instance in instances
+    )
+
+
+def _render_extract_messages(
+    doc: str,
+    json_schema_str: str,
+    last_response: str | None = None,
+    error: str | None = None,
+    additional_msg: str | None = None,
+) -> list[ChatCompletionUserMessageParam]:
+    template = JINJA_ENV.get_template(AvailableTemplates.JsonExtract.value)
+    user_prompt = template.render(
+        doc=doc,
+        json_schema=json_schema_str,
+        last_response=last_response,
+        error=error,
+        additional_msg=additional_msg,
+    )
+    return [ChatCompletionUserMessageParam(content=user_prompt, role="user")]
+
+
+async def _generate(
+    llm_service_name: str,
+    message: list[ChatCompletionUserMessageParam],
+    json_schema: type[BaseModel] | None = None,
+    cacheable: Callable[[str], bool] | None = None,
+) -> str:
+    """
+    经负载均衡器请求生成, 返回响应内容
+    在负载均衡之前查找 RESPONSE_CACHE 并合并并发的相同请求, 命中不占用实例的限额, 也不计入延迟统计
+
+    Args:
+        json_schema: 设置时按实例声明的原生结构化输出请求, 见 structured_output_response_format
+        cacheable: 只缓存通过该检查的响应 (如通过校验的抽取结果), 未通过的响应在下次请求时重新生成
+    """
+    async def delegate(service_instance):
+        kwargs = {}
+        if json_schema is not None:
+            kwargs["response_format"] = structured_output_response_format(service_instance, json_schema)
+        return await generation_delegate_for_async_openai(
+            service_instance,
+            message,
+            DEFAULT_RETRY_CONFIG,
+            **kwargs,
+        )
+
+    async def request() -> str:
+        response = await LOAD_BLANCER.execute(
+            llm_service_name,
+            delegate,
+            estimated_tokens=estimate_message_tokens(message),
+            hedge=DEFAULT_HEDGE_POLICY,
+            priority=Priority.BACKGROUND,
+        )
+        return response.choices[0].message.content
+
+    params = {"structured_output": json_schema.__name__} if json_schema is not None else {}
+    key = make_response_cache_key(llm_service_name, message, params)
+    return await RESPONSE_CACHE.get_or_create(key, request, cacheable)
+
+
+def _is_valid_json_for(json_schema: type[BaseModel]) -> Callable[[str], bool]:
+    def _check(content: str) -> bool:
+        try:
+            json_schema.model_validate_json(content)
+            return True
+        except ValidationError:
+            return False
+    return _check
+
+
+@Graph("json_extract", memoize=True)
 @dataclass
 class TryExtractJsonFromDoc:
     llm_service_name: str
@@ -81,36 +202,22 @@ class TryExtractJsonFromDoc:
 
     async def run(self) -> tuple["EndNode", "ErrorNode"]:
         # 解析JSON Schema
-        json_schema_dict = self.json_schema.model_json_schema()
-        json_schema_dict = resolve_refs_and_remove_defs(json_schema_dict)
-        json_schema_str = json.dumps(json_schema_dict, indent=2, ensure_ascii=False)
+        _, json_schema_str = resolved_json_schema(self.json_schema)
         # 构造用户提示
-        template = JINJA_ENV.get_template(AvailableTemplates.JsonExtract)
-        user_prompt = template.render(
-            doc=self.doc,
-            json_schema=json_schema_str,
+        message = _render_extract_messages(
+            self.doc,
+            json_schema_str,
             last_response=self.last_response,
             error=self.error,
             additional_msg=self.additional_msg,
         )
-        message = [
-            ChatCompletionUserMessageParam(content=user_prompt, role="user")
-        ]
         # 调用LLM
-        async def delegate(service_instance):
-            return await generation_delegate_for_async_openai(
-                service_instance,
-                message,
-                DEFAULT_RETRY_CONFIG
-            )
-        
-        response = await LOAD_BLANCER.execute(
+        response_content = await _generate(
             self.llm_service_name,
-            delegate,
+            message,
+            cacheable=_is_valid_json_for(self.json_schema),
         )
 
-        response_content = response.choices[0].message.content
-
         try:
             pd_model = self.json_schema.model_validate_json(response_content)
             return EndNode(pd_model), BypassSignal(ErrorNode)
@@ -138,7 +245,7 @@ class ErrorNode:
     
     async def run(self) -> None:
         # 使用LLM解释ValidationError为更清晰的自然语言
-        error_template = JINJA_ENV.get_template(AvailableTemplates.ErrorExplanation)
+        error_template = JINJA_ENV.get_template(AvailableTemplates.JsonExtractErrorExplanation.value)
         error_prompt = error_template.render(
             validation_error=self.error,
             json_schema=self.json_schema_str
@@ -147,31 +254,46 @@ class ErrorNode:
             ChatCompletionUserMessageParam(content=error_prompt, role="user")
         ]
         
-        async def error_delegate(service_instance):
-            return await generation_delegate_for_async_openai(
-                service_instance,
-                error_message,
-                DEFAULT_RETRY_CONFIG
-            )
-        
-        error_response = await LOAD_BLANCER.execute(
-            self.llm_service_name,
-            error_delegate,
-        )
-        
-        self.error = error_response.choices[0].message.content
+        self.error = await _generate(self.llm_service_name, error_message)
 
 class FailedToExtractJsonError(Exception):
     pass
 
 DATA_MODEL = TypeVar("DATA_MODEL")
 
+async def _extract_json_natively(
+    llm_service_name: str,
+    doc: str,
+    json_schema: type[BaseModel],
+    additional_msg: str | None = None,
+) -> tuple[BaseModel | None, str, str]:
+    """
+    使用服务端原生结构化输出抽取, 一次LLM调用, 不经过重试图
+
+    Returns:
+        (抽取结果, 响应内容, 校验错误), 校验失败时结果为 None
+    """
+    _, json_schema_str = resolved_json_schema(json_schema)
+    message = _render_extract_messages(doc, json_schema_str, additional_msg=additional_msg)
+    response_content = await _generate(
+        llm_service_name,
+        message,
+        json_schema=json_schema,
+        cacheable=_is_valid_json_for(json_schema),
+    )
+    try:
+        return json_schema.model_validate_json(response_content), response_content, ""
+    except ValidationError as e:
+        return None, response_content, str(e)
+
+
 async def extract_json_with_retry(
     llm_service_name: str,
     doc: str,
     json_schema: DATA_MODEL,
     max_retries: int = 1,
-    additional_msg: str | None = None
+    additional_msg: str | None = None,
+    memo_backend: MemoBackend | None = None,
 ) -> DATA_MODEL:
     """
     执行JSON提取图，支持最大重试次数直到获得有意义的结果
@@ -182,14 +304,30 @@ async def extract_json_with_retry(
         json_schema: 目标JSON的Pydantic模型类型
         max_retries: 最大重试次数
         additional_msg: 附加消息
+        memo_backend: 提取结果的缓存后端，相同文档与schema的提取会复用上次的LLM响应
         
     Returns:
         提取的Pydantic模型实例   
+
+    服务的所有实例都声明了原生结构化输出 (meta_data["structured_output"]) 时,
+    首次尝试直接以 response_format 请求, 校验通过即返回; 校验失败才进入重试图,
+    并以该次响应与错误作为修正的上下文.
     """
     last_response = None
     error = None
+    first_attempt = 0
+
+    if _supports_structured_output(llm_service_name):
+        result, last_response, error = await _extract_json_natively(
+            llm_service_name, doc, json_schema, additional_msg,
+        )
+        if result is not None:
+            return result
+        if max_retries == 0:
+            raise FailedToExtractJsonError(error)
+        first_attempt = 1
 
-    for attempt in range(max_retries + 1):
+    for attempt in range(first_attempt, max_retries + 1):
         initial_node = TryExtractJsonFromDoc(
             llm_service_name=llm_service_name,
             doc=doc,
@@ -199,7 +337,7 @@ async def extract_json_with_retry(
             additional_msg=additional_msg,
         )
         
-        nodes, params = await Graph.start("json_extract", initial_node)
+        nodes, params = await Graph.start("json_extract", initial_node, memo_backend=memo_backend)
         
         end_node: EndNode = nodes.get("EndNode")
         if end_node and end_node.result is not None:
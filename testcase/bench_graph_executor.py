@@ -0,0 +1,227 @@
+"""
+Synthetic DAG benchmark of the graph executor.
+
+Generates dataclass node graphs of several shapes, then measures the scheduling
+overhead per node, the memory allocated per run and the throughput of concurrent
+`start` calls. Results are printed (or written) as JSON; given a baseline file the
+script exits with status 1 when a metric regressed beyond the tolerance.
+
+    python testcase/bench_graph_executor.py --sizes 1000 10000 --out bench.json
+    python testcase/bench_graph_executor.py --baseline bench.json --tolerance 0.3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field, make_dataclass
+from pathlib import Path
+from typing import Any
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from api.graph_executor.graph import GraphMgr
+from api.graph_executor.graph_core import BypassSignal, ParamsList
+
+
+@dataclass
+class SyntheticGraph:
+    name: str
+    graph: GraphMgr
+    node_count: int
+    make_seed: Callable[[], Any]
+
+
+def _build(name: str,
+           successors: dict[str, list[str]],
+           bypassed: dict[str, set[str]] | None = None) -> SyntheticGraph:
+    """
+    register one dataclass node per key of `successors`, the first key is the root.
+    every node forwards its value to its successors, except those in `bypassed`.
+    """
+    bypassed = bypassed or {}
+    graph = GraphMgr()
+    classes: dict[str, type] = {}
+
+    def _make_run(node: str) -> Callable:
+        targets = successors[node]
+        skip = bypassed.get(node, set())
+
+        async def run(self):
+            if not targets:
+                return None
+            return tuple(
+                BypassSignal(t) if t in skip else classes[t](value=self.value)
+                for t in targets
+            )
+
+        if targets:
+            run.__annotations__ = {"return": tuple.__class_getitem__(tuple(targets))}
+        return run
+
+    for node in successors:
+        cls = make_dataclass(
+            node,
+            [("value", ParamsList[int] | None, field(default=None))],
+            namespace={"run": _make_run(node)},
+        )
+        classes[node] = cls
+        graph(name)(cls)
+
+    root = next(iter(successors))
+    return SyntheticGraph(name, graph, len(successors), lambda: classes[root](value=ParamsList([1])))
+
+
+def chain(n: int) -> SyntheticGraph:
+    successors = {f"N{i}": [f"N{i + 1}"] if i + 1 < n else [] for i in range(n)}
+    return _build(f"chain_{n}", successors)
+
+
+def fan_out(n: int) -> SyntheticGraph:
+    leaves = [f"L{i}" for i in range(n - 2)]
+    successors = {"Root": leaves, **{leaf: ["Join"] for leaf in leaves}, "Join": []}
+    return _build(f"fan_out_{n}", successors)
+
+
+def diamonds(n: int) -> SyntheticGraph:
+    successors: dict[str, list[str]] = {}
+    count = max(1, n // 3)
+    for i in range(count):
+        head, left, right = f"H{i}", f"A{i}", f"B{i}"
+        tail = f"H{i + 1}"
+        successors[head] = [left, right]
+        successors[left] = [tail]
+        successors[right] = [tail]
+    successors[f"H{count}"] = []
+    return _build(f"diamonds_{n}", successors)
+
+
+def bypass_heavy(n: int) -> SyntheticGraph:
+    branches = max(1, (n - 1) // 2)
+    successors: dict[str, list[str]] = {"Root": [f"B{i}" for i in range(branches)]}
+    for i in range(branches):
+        successors[f"B{i}"] = [f"C{i}"]
+        successors[f"C{i}"] = []
+    # only the first branch runs, the others are bypassed down to their leaves
+    bypassed = {"Root": {f"B{i}" for i in range(1, branches)}}
+    return _build(f"bypass_heavy_{n}", successors, bypassed)
+
+
+SHAPES: dict[str, Callable[[int], SyntheticGraph]] = {
+    "chain": chain,
+    "fan_out": fan_out,
+    "diamonds": diamonds,
+    "bypass_heavy": bypass_heavy,
+}
+
+
+async def _run_once(g: SyntheticGraph) -> float:
+    started = time.perf_counter()
+    await g.graph.start(g.name, g.make_seed())
+    return time.perf_counter() - started
+
+
+async def measure(g: SyntheticGraph, repeats: int, concurrency: int) -> dict[str, Any]:
+    started = time.perf_counter()
+    g.graph.compile(g.name)
+    compile_time = time.perf_counter() - started
+
+    # warm up
+    await _run_once(g)
+    durations = [await _run_once(g) for _ in range(repeats)]
+    run_time = statistics.median(durations)
+
+    tracemalloc.start()
+    await _run_once(g)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[_run_once(g) for _ in range(concurrency)])
+    concurrent_time = time.perf_counter() - started
+
+    return {
+        "graph": g.name,
+        "nodes": g.node_count,
+        "compile_ms": compile_time * 1000,
+        "run_ms": run_time * 1000,
+        "overhead_us_per_node": run_time / g.node_count * 1e6,
+        "peak_memory_kb_per_run": peak_memory / 1024,
+        "concurrent_runs": concurrency,
+        "throughput_runs_per_s": concurrency / concurrent_time,
+    }
+
+
+def run_suite(sizes: list[int],
+              shapes: list[str] | None = None,
+              repeats: int = 5,
+              concurrency: int = 8) -> list[dict[str, Any]]:
+    results = []
+    for shape in shapes or list(SHAPES):
+        for size in sizes:
+            g = SHAPES[shape](size)
+            results.append(asyncio.run(measure(g, repeats, concurrency)))
+    return results
+
+
+# metric -> True if higher is better
+REGRESSION_METRICS = {
+    "overhead_us_per_node": False,
+    "peak_memory_kb_per_run": False,
+    "throughput_runs_per_s": True,
+}
+
+
+def compare(results: list[dict[str, Any]],
+            baseline: list[dict[str, Any]],
+            tolerance: float) -> list[str]:
+    """
+    regressions of `results` against `baseline` beyond the relative tolerance.
+    """
+    base = {b["graph"]: b for b in baseline}
+    regressions = []
+    for r in results:
+        b = base.get(r["graph"])
+        if b is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            if higher_is_better:
+                regressed = r[metric] < b[metric] * (1 - tolerance)
+            else:
+                regressed = r[metric] > b[metric] * (1 + tolerance)
+            if regressed:
+                regressions.append(f"{r['graph']} {metric}: {b[metric]:.2f} -> {r[metric]:.2f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.shapes, args.repeats, args.concurrency)
+    output = json.dumps(results, indent=2)
+    if args.out:
+        args.out.write_text(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -71,6 +71,605 @@ class D:
     async def run(self) -> None:
         pass
 
+
+@Graph("test_long_names")
+@dataclass
+class ExtractNode:
+    doc: str
+
+    async def run(self) -> tuple["SuccessNode", "FailureNode"]:
+        if self.doc:
+            return SuccessNode(self.doc.upper()), BypassSignal(FailureNode)
+        return BypassSignal(SuccessNode), FailureNode("empty doc")
+
+@Graph("test_long_names")
+@dataclass
+class SuccessNode:
+    result: str
+
+    async def run(self) -> None:
+        pass
+
+@Graph("test_long_names")
+@dataclass
+class FailureNode:
+    error: str
+
+    async def run(self) -> None:
+        pass
+
+
+def test_graph_bypass():
+    import asyncio
+    nodes, _ = asyncio.run(Graph.start("test", A("1", 120)))
+    assert nodes["D"] is None
+    assert nodes["C"].msg.startswith("1 | A processed")
+
+
+def test_graph_with_multi_char_node_names():
+    import asyncio
+    nodes, _ = asyncio.run(Graph.start("test_long_names", ExtractNode("doc")))
+    assert nodes["SuccessNode"].result == "DOC"
+    assert nodes["FailureNode"] is None
+
+    nodes, _ = asyncio.run(Graph.start("test_long_names", ExtractNode("")))
+    assert nodes["SuccessNode"] is None
+    assert nodes["FailureNode"].error == "empty doc"
+
+
+def test_compiled_plan_is_reused_until_redefined():
+    import asyncio
+    from api.graph_executor.graph import GraphMgr
+
+    graph = GraphMgr()
+
+    @graph("plan")
+    @dataclass
+    class Head:
+        value: int
+
+        async def run(self) -> "Tail":
+            return Tail(self.value + 1)
+
+    @graph("plan")
+    @dataclass
+    class Tail:
+        value: ParamsList[int] | None
+
+        async def run(self) -> None:
+            pass
+
+    plan = graph.compile("plan")
+    assert graph.compile("plan") is plan
+    assert plan.predecessor_graph["Tail"] == frozenset({"Head"})
+
+    nodes, _ = asyncio.run(graph.start("plan", Head(1)))
+    assert nodes["Tail"].value == [2]
+    assert graph.compile("plan") is plan
+
+    @graph("plan")
+    @dataclass
+    class Other:
+        async def run(self) -> None:
+            pass
+
+    assert graph.compile("plan") is not plan
+
+
+def test_yield_return():
+    import asyncio
+
+    async def _collect():
+        runner = await Graph.start("test_long_names", ExtractNode("doc"), yield_return=True)
+        return [node async for node, _, _ in runner]
+
+    finalized = asyncio.run(_collect())
+    assert finalized[0] == "ExtractNode"
+    assert set(finalized) == {"ExtractNode", "SuccessNode", "FailureNode"}
+
+
+
+MEMO_RUN_COUNT = {"count": 0}
+
+@Graph("test_memo")
+@dataclass
+class MemoSource:
+    value: int
+
+    async def run(self) -> "MemoizedNode":
+        return MemoizedNode(self.value)
+
+@Graph("test_memo", memoize=True)
+@dataclass
+class MemoizedNode:
+    value: int
+    doubled: int | None = None
+
+    async def run(self, source: MemoSource) -> "MemoSink":
+        MEMO_RUN_COUNT["count"] += 1
+        self.doubled = self.value * 2
+        return MemoSink(self.doubled)
+
+@Graph("test_memo")
+@dataclass
+class MemoSink:
+    value: int
+
+    async def run(self) -> None:
+        pass
+
+
+def test_memoized_node_is_replayed():
+    import asyncio
+    from api.graph_executor import LRUMemoBackend
+
+    backend = LRUMemoBackend(max_size=1)
+    MEMO_RUN_COUNT["count"] = 0
+
+    nodes, _ = asyncio.run(Graph.start("test_memo", MemoSource(2), memo_backend=backend))
+    assert nodes["MemoSink"].value == 4
+    nodes, _ = asyncio.run(Graph.start("test_memo", MemoSource(2), memo_backend=backend))
+    assert nodes["MemoizedNode"].doubled == 4
+    assert nodes["MemoSink"].value == 4
+    assert MEMO_RUN_COUNT["count"] == 1
+
+    # different inputs miss and evict the previous entry
+    asyncio.run(Graph.start("test_memo", MemoSource(3), memo_backend=backend))
+    asyncio.run(Graph.start("test_memo", MemoSource(2), memo_backend=backend))
+    assert MEMO_RUN_COUNT["count"] == 3
+
+    # without backend memoization is off
+    asyncio.run(Graph.start("test_memo", MemoSource(3)))
+    assert MEMO_RUN_COUNT["count"] == 4
+
+
+def test_memo_key_is_stable_across_processes():
+    import os
+    import subprocess
+    from api.graph_executor.memoization import make_memo_key
+
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]);"
+        "from api.graph_executor.memoization import make_memo_key;"
+        "tags = {'alpha', 'beta', 'gamma', 'delta'};"
+        "print(make_memo_key('g', 'n', {'tags': tags}, {'a': tags, 'b': frozenset(tags), 'c': {2: 'x', 1: 'y'}}))"
+    )
+    root = str(Path(__file__).parent.parent)
+    keys = {
+        subprocess.run([sys.executable, "-c", script, root], capture_output=True, text=True, check=True,
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout.strip()
+        for seed in ("1", "2", "3")
+    }
+    assert len(keys) == 1
+
+    # shared references do not change the key
+    shared = ["x"]
+    assert make_memo_key("g", "n", {}, {"a": shared, "b": shared}) == make_memo_key("g", "n", {}, {"a": ["x"], "b": ["x"]})
+    assert make_memo_key("g", "n", {}, {"a": (1,)}) != make_memo_key("g", "n", {}, {"a": [1]})
+
+
+
+RESUME_STATE = {"head_runs": 0, "fail": True}
+
+@Graph("test_resume")
+@dataclass
+class ResumeHead:
+    value: int
+
+    async def run(self) -> "ResumeFlaky":
+        RESUME_STATE["head_runs"] += 1
+        return ResumeFlaky(self.value + 1)
+
+@Graph("test_resume")
+@dataclass
+class ResumeFlaky:
+    value: int
+
+    async def run(self, head: ResumeHead) -> "ResumeTail":
+        if RESUME_STATE["fail"]:
+            raise RuntimeError("crash")
+        return ResumeTail(self.value + head.value)
+
+@Graph("test_resume")
+@dataclass
+class ResumeTail:
+    value: int
+
+    async def run(self) -> None:
+        pass
+
+
+def test_resume_from_checkpoint():
+    import asyncio
+    import pytest
+    from api.graph_executor import MemoryCheckpointStore
+    from api.graph_executor.exceptions import UnExpectedNodeError
+
+    store = MemoryCheckpointStore()
+    Graph.set_checkpoint_store(store)
+    try:
+        with pytest.raises(UnExpectedNodeError):
+            asyncio.run(Graph.start("test_resume", ResumeHead(1), run_id="run-1"))
+        assert RESUME_STATE["head_runs"] == 1
+
+        RESUME_STATE["fail"] = False
+        nodes, _ = asyncio.run(Graph.resume("run-1"))
+        assert RESUME_STATE["head_runs"] == 1
+        assert nodes["ResumeTail"].value == 3
+
+        # checkpoint is cleared once the run completes
+        with pytest.raises(ValueError):
+            asyncio.run(Graph.resume("run-1"))
+    finally:
+        Graph.set_checkpoint_store(None)
+
+
+
+def test_node_pool_limit_timeout_and_deadline():
+    import asyncio
+    import pytest
+    from api.graph_executor import GraphMgr, get_graph_deadline
+    from api.graph_executor.exceptions import UnExpectedNodeError
+
+    graph = GraphMgr()
+    running = {"now": 0, "max": 0}
+    seen_deadline = []
+
+    @graph("pools")
+    @dataclass
+    class Fan:
+        delay: float
+
+        async def run(self) -> tuple["W1", "W2", "W3"]:
+            return W1(self.delay), W2(self.delay), W3(self.delay)
+
+    async def _work(delay):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        seen_deadline.append(get_graph_deadline())
+        await asyncio.sleep(delay)
+        running["now"] -= 1
+
+    @graph("pools", pool="llm")
+    @dataclass
+    class W1:
+        delay: float
+        async def run(self) -> None:
+            await _work(self.delay)
+
+    @graph("pools", pool="llm")
+    @dataclass
+    class W2:
+        delay: float
+        async def run(self) -> None:
+            await _work(self.delay)
+
+    @graph("pools", pool="llm", timeout=0.05)
+    @dataclass
+    class W3:
+        delay: float
+        async def run(self) -> None:
+            await _work(self.delay)
+
+    async def _main():
+        graph.set_pool_limit("llm", 1)
+        deadline = asyncio.get_running_loop().time() + 5
+        await graph.start("pools", Fan(0.01), deadline=deadline)
+        assert running["max"] == 1
+        assert seen_deadline == [deadline] * 3
+
+        # W3 exceeds its own timeout
+        with pytest.raises(UnExpectedNodeError):
+            await graph.start("pools", Fan(0.2))
+
+        # an expired graph deadline cancels the node runs
+        graph.set_pool_limit("llm", None)
+        with pytest.raises(UnExpectedNodeError):
+            await graph.start("pools", Fan(0.01), deadline=asyncio.get_running_loop().time())
+
+    asyncio.run(_main())
+
+
+
+@Graph("test_compute")
+@dataclass
+class ComputeSource:
+    text: str
+
+    async def run(self) -> tuple["ProcessCompute", "ThreadCompute"]:
+        return ProcessCompute(self.text), ThreadCompute(self.text)
+
+@Graph("test_compute")
+@dataclass
+class ProcessCompute:
+    text: str
+    words: int | None = None
+
+    def compute(self, source: ComputeSource) -> None:
+        import os
+        self.words = len(source.text.split())
+        self.pid = os.getpid()
+
+@Graph("test_compute", executor="thread")
+@dataclass
+class ThreadCompute:
+    text: str
+
+    def compute(self) -> "ComputeSink":
+        return ComputeSink(self.text.upper())
+
+@Graph("test_compute")
+@dataclass
+class ComputeSink:
+    text: str
+
+    async def run(self) -> None:
+        pass
+
+
+def test_compute_nodes_are_offloaded():
+    import asyncio
+    import os
+
+    Graph.node_executors.start()
+    try:
+        nodes, _ = asyncio.run(Graph.start("test_compute", ComputeSource("a b c")))
+    finally:
+        Graph.node_executors.shutdown()
+    assert nodes["ProcessCompute"].words == 3
+    assert nodes["ProcessCompute"].pid != os.getpid()
+    assert nodes["ComputeSink"].text == "A B C"
+
+
+
+def test_map_node_fans_out_to_children():
+    import asyncio
+    from api.graph_executor import GraphMgr
+
+    graph = GraphMgr()
+    running = {"now": 0, "max": 0}
+
+    @dataclass
+    class CountWords:
+        page: str
+
+        async def run(self) -> int:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return len(self.page.split())
+
+    @graph("map", map_over="pages", map_to=CountWords, map_concurrency=2)
+    @dataclass
+    class CountPages:
+        pages: list[str]
+        results: ParamsList[int] | None = None
+
+        async def run(self) -> "SumCounts":
+            return SumCounts(self.results)
+
+    @graph("map")
+    @dataclass
+    class SumCounts:
+        counts: list[int]
+        total: int | None = None
+
+        async def run(self) -> None:
+            self.total = sum(self.counts)
+
+    pages = ["a", "a b", "a b c", "a b c d", "a b c d e"]
+    nodes, _ = asyncio.run(graph.start("map", CountPages(pages)))
+    assert nodes["CountPages"].results == [1, 2, 3, 4, 5]
+    assert nodes["SumCounts"].total == 15
+    assert running["max"] == 2
+
+
+
+def test_map_node_fans_out_before_streaming_and_batched_run():
+    import asyncio
+    from api.graph_executor import GraphMgr, StreamReturn
+
+    graph = GraphMgr()
+
+    @dataclass
+    class Length:
+        item: str
+
+        async def run(self) -> int:
+            return len(self.item)
+
+    @graph("map_stream", map_over="items", map_to=Length)
+    @dataclass
+    class StreamLengths:
+        items: list[str]
+        results: ParamsList[int] | None = None
+
+        async def run(self) -> "StreamSink":
+            for length in self.results:
+                yield length
+            yield StreamReturn(StreamSink())
+
+    @graph("map_stream")
+    @dataclass
+    class StreamSink:
+        async def run(self) -> None:
+            pass
+
+    nodes, _ = asyncio.run(graph.start("map_stream", StreamLengths(["a", "bb"])))
+    assert nodes["StreamLengths"].results == [1, 2]
+
+    @graph("map_batch", map_over="items", map_to=Length)
+    @dataclass
+    class BatchLengths:
+        items: list[str]
+        results: ParamsList[int] | None = None
+        total: int | None = None
+
+        async def run(self) -> "BatchSink":
+            raise AssertionError("run_batch is expected")
+
+        @classmethod
+        async def run_batch(cls, instances: list["BatchLengths"], run_params: list[dict]) -> list["BatchSink"]:
+            for instance in instances:
+                instance.total = sum(instance.results)
+            return [BatchSink() for _ in instances]
+
+    @graph("map_batch")
+    @dataclass
+    class BatchSink:
+        async def run(self) -> None:
+            pass
+
+    results = asyncio.run(graph.start_many("map_batch", [BatchLengths(["a", "bb"]), BatchLengths(["ccc"])]))
+    assert [nodes["BatchLengths"].total for nodes, _ in results] == [3, 3]
+
+
+
+def test_start_many_batches_nodes():
+    import asyncio
+    from api.graph_executor import GraphMgr
+
+    graph = GraphMgr()
+    batch_sizes = []
+
+    @graph("batch")
+    @dataclass
+    class Doc:
+        text: str
+
+        async def run(self) -> "Embed":
+            return Embed(self.text)
+
+    @graph("batch")
+    @dataclass
+    class Embed:
+        text: str
+        vector: list[int] | None = None
+
+        async def run(self) -> None:
+            raise AssertionError("run_batch is expected")
+
+        @classmethod
+        async def run_batch(cls, instances: list["Embed"], run_params: list[dict]) -> list[None]:
+            batch_sizes.append(len(instances))
+            for instance in instances:
+                instance.vector = [len(instance.text)]
+            return [None] * len(instances)
+
+    seeds = [Doc("a" * i) for i in range(1, 7)]
+    results = asyncio.run(graph.start_many("batch", seeds, concurrency=3))
+    assert [nodes["Embed"].vector for nodes, _ in results] == [[i] for i in range(1, 7)]
+    assert batch_sizes == [3, 3]
+
+    # single runs still use run
+    import pytest
+    with pytest.raises(Exception):
+        asyncio.run(graph.start("batch", Doc("a")))
+
+
+
+def test_streaming_node_pipelines_to_consumer():
+    import asyncio
+    from api.graph_executor import GraphMgr, NodeStream, StreamReturn
+
+    graph = GraphMgr()
+    events = []
+
+    @graph("stream")
+    @dataclass
+    class Generate:
+        prompt: str
+
+        async def run(self) -> "Collect":
+            for token in self.prompt.split():
+                events.append(f"yield {token}")
+                yield token
+                await asyncio.sleep(0.01)
+            yield StreamReturn(Collect(self.prompt))
+
+    @graph("stream")
+    @dataclass
+    class Forward:
+        forwarded: list[str] | None = None
+
+        async def run(self, tokens: NodeStream["Generate"]) -> None:
+            self.forwarded = []
+            async for token in tokens:
+                events.append(f"forward {token}")
+                self.forwarded.append(token)
+
+    @graph("stream")
+    @dataclass
+    class Collect:
+        text: str
+
+        async def run(self, forward: Forward) -> None:
+            assert forward.forwarded == self.text.split()
+
+    nodes, _ = asyncio.run(graph.start("stream", Generate("a b c")))
+    assert nodes["Forward"].forwarded == ["a", "b", "c"]
+    assert nodes["Collect"].text == "a b c"
+    # the consumer handles each token before the producer finishes
+    assert events.index("forward a") < events.index("yield c")
+    assert "Generate -. stream .-> Forward" in graph.render_as_mermaid("stream")
+
+
+
+def test_profiler_reports_critical_path():
+    import asyncio
+    from api.graph_executor import GraphMgr, GraphProfiler
+
+    graph = GraphMgr()
+
+    @graph("profile")
+    @dataclass
+    class Split:
+        async def run(self) -> tuple["Fast", "Slow"]:
+            return Fast(), Slow()
+
+    @graph("profile")
+    @dataclass
+    class Fast:
+        async def run(self) -> "Join":
+            return Join()
+
+    @graph("profile")
+    @dataclass
+    class Slow:
+        async def run(self) -> "Join":
+            await asyncio.sleep(0.05)
+            return Join()
+
+    @graph("profile")
+    @dataclass
+    class Join:
+        async def run(self) -> None:
+            pass
+
+    profiler = GraphProfiler()
+    asyncio.run(graph.start("profile", Split(), profiler=profiler))
+    report = profiler.report
+    assert report.critical_path == ["Split", "Slow", "Join"]
+    assert report.dominant_node() == "Slow"
+    assert report.nodes["Slow"].run_time >= 0.05
+    assert report.to_dict()["nodes"]["Fast"]["run_time"] < 0.05
+
+    mm = graph.render_as_mermaid("profile", profile=report)
+    assert "class Split,Slow,Join critical;" in mm
+    assert 'Slow["Slow<br/>run ' in mm
+
+
+
+def test_benchmark_suite_smoke():
+    from bench_graph_executor import compare, run_suite
+
+    results = run_suite([12], repeats=1, concurrency=2)
+    assert {r["graph"] for r in results} == {"chain_12", "fan_out_12", "diamonds_12", "bypass_heavy_12"}
+    assert all(r["overhead_us_per_node"] > 0 for r in results)
+    assert compare(results, results, tolerance=0.1) == []
+
+
 if __name__ == "__main__":
     import asyncio
     # a = A("1", 20)
@@ -0,0 +1,939 @@
+from pathlib import Path
+import asyncio
+import os
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# importing api.load_balance registers the default services, which need a key
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-test")
+
+from api.load_balance.admission import (
+    AdmissionController,
+    Priority,
+    PriorityClassConfig,
+    request_priority,
+)
+from api.load_balance.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from api.load_balance.circuit_breaker import CircuitBreaker, CircuitState
+from api.load_balance.distributed_rate_limit import LeasedBucket
+from api.load_balance.exception import (
+    AdmissionRejectedError,
+    LimitExceededError,
+    RetryBudgetExhaustedError,
+    ServiceError,
+)
+from api.load_balance.hedging import HedgePolicy
+from api.load_balance.load_balancer import LoadBalancer
+from api.load_balance.load_balance_strategy import (
+    LeastOutstandingRequestsStrategy,
+    PeakEwmaStrategy,
+    RoundRobinStrategy,
+)
+from api.load_balance.rate_limit import InstanceRateLimiter, RateLimiter, estimate_message_tokens
+from api.load_balance.service_instance import ServiceInstanceBase
+from api.load_balance.service_regeistry import ServiceConfig, ServiceRegistry
+
+
+def _balancer(n: int, **kwargs) -> tuple[LoadBalancer, list[ServiceInstanceBase]]:
+    registry = ServiceRegistry()
+    instances = [ServiceInstanceBase(f"instance-{i}") for i in range(n)]
+    for instance in instances:
+        registry.register_service("svc", instance)
+    return LoadBalancer(registry, **kwargs), instances
+
+
+def test_round_robin_state_persists_across_calls():
+    balancer, instances = _balancer(3, strategy_type=RoundRobinStrategy)
+
+    async def request(instance):
+        return instance
+
+    async def main():
+        return [await balancer.execute("svc", request) for _ in range(6)]
+
+    assert asyncio.run(main()) == instances * 2
+
+
+def test_least_outstanding_requests_spreads_concurrent_calls():
+    balancer, instances = _balancer(3)
+    strategy = LeastOutstandingRequestsStrategy()
+    balancer.registry.set_service_strategy("svc", strategy)
+    release = asyncio.Event()
+
+    async def request(instance):
+        await release.wait()
+        return instance
+
+    async def main():
+        tasks = [asyncio.create_task(balancer.execute("svc", request)) for _ in range(6)]
+        await asyncio.sleep(0)
+        assert [strategy.outstanding(i) for i in instances] == [2, 2, 2]
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    chosen = asyncio.run(main())
+    assert sorted(chosen.count(i) for i in instances) == [2, 2, 2]
+    assert [strategy.outstanding(i) for i in instances] == [0, 0, 0]
+
+
+def test_open_streams_count_as_outstanding_until_consumed():
+    balancer, instances = _balancer(2)
+    strategy = LeastOutstandingRequestsStrategy()
+    balancer.registry.set_service_strategy("svc", strategy)
+
+    async def stream():
+        yield "chunk"
+
+    async def request(instance):
+        return stream()
+
+    async def main():
+        streams = [await balancer.execute("svc", request) for _ in range(4)]
+        assert [strategy.outstanding(i) for i in instances] == [2, 2]
+        for s in streams:
+            assert [chunk async for chunk in s] == ["chunk"]
+        assert [strategy.outstanding(i) for i in instances] == [0, 0]
+
+    asyncio.run(main())
+
+
+def test_rate_limited_instance_overflows_to_another():
+    registry = ServiceRegistry()
+    limited = ServiceInstanceBase("limited", rpm=1)
+    spare = ServiceInstanceBase("spare")
+    registry.register_service("svc", limited)
+    registry.register_service("svc", spare)
+    balancer = LoadBalancer(registry, strategy_type=RoundRobinStrategy)
+
+    async def request(instance):
+        return instance
+
+    async def main():
+        return [await balancer.execute("svc", request) for _ in range(3)]
+
+    # the second turn of `limited` has no budget left, `spare` takes it
+    assert asyncio.run(main()) == [limited, spare, spare]
+
+
+def test_token_budget_is_reconciled_from_usage():
+    limiter = InstanceRateLimiter(tpm=600)
+
+    async def main():
+        assert await limiter.try_acquire(estimated_tokens=500) == 0
+        # 100 tokens left, refilled at 10 per second
+        assert await limiter.try_acquire(estimated_tokens=200) > 0
+        limiter.reconcile(estimated_tokens=500, actual_tokens=100)
+        assert await limiter.try_acquire(estimated_tokens=200) == 0
+
+    asyncio.run(main())
+    assert estimate_message_tokens([{"role": "user", "content": "hello world"}]) > 0
+
+
+def test_stream_token_budget_is_reconciled_from_final_usage():
+    from types import SimpleNamespace
+
+    import pytest
+
+    registry = ServiceRegistry()
+    limiter = InstanceRateLimiter(tpm=6000)
+    registry.register_service("svc", ServiceInstanceBase("streams", rate_limiter=limiter))
+    balancer = LoadBalancer(registry)
+
+    async def chunks():
+        yield SimpleNamespace(usage=None)
+        # the usage chunk closes the stream when stream_options.include_usage is set
+        yield SimpleNamespace(usage=SimpleNamespace(total_tokens=3000))
+
+    async def request(instance):
+        return chunks()
+
+    async def main():
+        stream = await balancer.execute("svc", request, estimated_tokens=100)
+        # only the prompt estimate is charged while the stream is open
+        assert limiter.tokens.tokens == pytest.approx(5900, abs=1)
+        assert len([c async for c in stream]) == 2
+        assert limiter.tokens.tokens == pytest.approx(3000, abs=1)
+
+    asyncio.run(main())
+
+
+def test_circuit_breaker_ejects_failing_instance_and_probes_it():
+    registry = ServiceRegistry()
+    broken = ServiceInstanceBase("broken")
+    healthy = ServiceInstanceBase("healthy")
+    breaker = CircuitBreaker(failure_threshold=2, open_duration=0.05)
+    registry.register_service("svc", broken, circuit_breaker=breaker)
+    registry.register_service("svc", healthy)
+    registry.set_service_config("svc", ServiceConfig(retry_delay=0))
+    balancer = LoadBalancer(registry, strategy_type=RoundRobinStrategy)
+    calls = []
+    recovered = False
+
+    async def request(instance):
+        calls.append(instance)
+        if instance is broken and not recovered:
+            raise ServiceError
+        return instance
+
+    async def main():
+        nonlocal recovered
+        for _ in range(4):
+            assert await balancer.execute("svc", request) is healthy
+        assert breaker.state is CircuitState.OPEN
+        ejected_calls = len(calls)
+        for _ in range(3):
+            await balancer.execute("svc", request)
+        # no traffic reaches the ejected instance during the cool down
+        assert broken not in calls[ejected_calls:]
+
+        await asyncio.sleep(0.06)
+        assert breaker.state is CircuitState.HALF_OPEN
+        recovered = True
+        results = [await balancer.execute("svc", request) for _ in range(2)]
+        assert broken in results
+        assert breaker.state is CircuitState.CLOSED
+
+    asyncio.run(main())
+
+
+class _SlowRateLimiter(RateLimiter):
+    """stands in for DistributedRateLimiter, every check is a round trip"""
+    def __init__(self, refuse: bool = False) -> None:
+        self.refuse = refuse
+
+    async def try_acquire(self, estimated_tokens: int = 0) -> float:
+        await asyncio.sleep(0)
+        return 1.0 if self.refuse else 0.0
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        pass
+
+
+def test_half_open_probe_is_reserved_before_rate_limit_round_trip():
+    registry = ServiceRegistry()
+    instance = ServiceInstanceBase("recovering", rate_limiter=_SlowRateLimiter())
+    breaker = CircuitBreaker(failure_threshold=1, open_duration=0)
+    registry.register_service("svc", instance, circuit_breaker=breaker)
+    breaker.record_failure()
+    assert breaker.state is CircuitState.HALF_OPEN
+    balancer = LoadBalancer(registry)
+    probes = []
+
+    async def request(instance):
+        if breaker.state is CircuitState.HALF_OPEN:
+            probes.append(instance)
+        await asyncio.sleep(0.01)
+        return instance
+
+    async def main():
+        await asyncio.gather(*[balancer.execute("svc", request) for _ in range(3)])
+
+    asyncio.run(main())
+    # only the probe reaches the half open instance, the others wait for it to close
+    assert len(probes) == 1
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_rate_limit_refusal_rolls_back_reservations():
+    registry = ServiceRegistry()
+    refusing = ServiceInstanceBase("refusing",
+                                   rate_limiter=_SlowRateLimiter(refuse=True),
+                                   concurrency_limiter=AdaptiveConcurrencyLimiter("refusing"))
+    spare = ServiceInstanceBase("spare")
+    registry.register_service("svc", refusing)
+    registry.register_service("svc", spare)
+    strategy = LeastOutstandingRequestsStrategy()
+    registry.set_service_strategy("svc", strategy)
+    balancer = LoadBalancer(registry)
+    release = asyncio.Event()
+
+    async def request(instance):
+        await release.wait()
+        return instance
+
+    async def main():
+        tasks = [asyncio.create_task(balancer.execute("svc", request)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert strategy.outstanding(refusing) == 0
+        assert refusing.concurrency_limiter.in_flight == 0
+        assert strategy.outstanding(spare) == 3
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [spare] * 3
+
+
+def test_peak_ewma_prefers_fast_instance():
+    balancer, (slow, fast) = _balancer(2)
+    balancer.registry.set_service_strategy("svc", PeakEwmaStrategy())
+
+    async def request(instance):
+        await asyncio.sleep(0.02 if instance is slow else 0.001)
+        return instance
+
+    async def main():
+        # both are unobserved at first and get explored
+        return [await balancer.execute("svc", request) for _ in range(20)]
+
+    chosen = asyncio.run(main())
+    assert chosen[-10:].count(fast) == 10
+
+
+def test_hedged_request_returns_first_response_and_cancels_loser():
+    balancer, (stalled, backup) = _balancer(2, strategy_type=RoundRobinStrategy)
+    cancelled = []
+
+    async def request(instance):
+        try:
+            await asyncio.sleep(10 if instance is stalled else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(instance)
+            raise
+        return instance
+
+    async def main():
+        policy = HedgePolicy(min_samples=3, min_delay=0.02)
+        for _ in range(3):
+            balancer.registry.get_latency_window(stalled).record(0.01)
+        result = await asyncio.wait_for(balancer.execute("svc", request, hedge=policy), 1)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) is backup
+    assert cancelled == [stalled]
+
+
+def test_no_hedge_until_enough_latency_samples():
+    balancer, (first, _) = _balancer(2, strategy_type=RoundRobinStrategy)
+    calls = []
+
+    async def request(instance):
+        calls.append(instance)
+        await asyncio.sleep(0.05)
+        return instance
+
+    policy = HedgePolicy(min_samples=3, min_delay=0.01)
+    assert asyncio.run(balancer.execute("svc", request, hedge=policy)) is first
+    assert calls == [first]
+
+
+class _SharedBucket:
+    """stands in for RedisTokenBucket, counts the round trips"""
+    def __init__(self, tokens: int) -> None:
+        self.tokens = tokens
+        self.calls = 0
+
+    async def take(self, requested: int, minimum: int) -> tuple[int, float]:
+        self.calls += 1
+        if self.tokens < minimum:
+            return 0, 1.0
+        granted = min(requested, self.tokens)
+        self.tokens -= granted
+        return granted, 0.0
+
+
+def test_leased_bucket_serves_requests_from_local_lease():
+    shared = _SharedBucket(tokens=10)
+    replica_a = LeasedBucket(shared, lease_size=4)
+    replica_b = LeasedBucket(shared, lease_size=4)
+
+    async def main():
+        assert [await replica_a.try_acquire(1) for _ in range(4)] == [0, 0, 0, 0]
+        assert shared.calls == 1
+        assert await replica_b.try_acquire(1) == 0
+        assert await replica_a.try_acquire(1) == 0
+        # all 10 tokens are leased out, 3 are held by replica b and 1 by replica a
+        assert shared.tokens == 0
+        assert (replica_a.balance, replica_b.balance) == (1, 3)
+        assert await replica_a.try_acquire(3) > 0
+        replica_b.adjust(-4)
+        assert replica_b.balance == -1
+
+    asyncio.run(main())
+
+
+def test_admission_serves_interactive_before_background():
+    controller = AdmissionController(2, {
+        Priority.INTERACTIVE: PriorityClassConfig(share=1.0),
+        Priority.BACKGROUND: PriorityClassConfig(share=0.5, max_queue_time=0.05),
+    })
+    admitted = []
+
+    async def request(priority: Priority, name: str):
+        await controller.acquire(priority)
+        admitted.append(name)
+
+    async def main():
+        await request(Priority.BACKGROUND, "bg-1")
+        # background is capped at its share of one slot
+        bg_2 = asyncio.create_task(request(Priority.BACKGROUND, "bg-2"))
+        await request(Priority.INTERACTIVE, "chat-1")
+        chat_2 = asyncio.create_task(request(Priority.INTERACTIVE, "chat-2"))
+        await asyncio.sleep(0)
+        controller.release(Priority.BACKGROUND)
+        await chat_2
+        # bg-2 is shed once it waited longer than its queue time
+        try:
+            await bg_2
+        except AdmissionRejectedError:
+            return admitted
+        raise AssertionError("bg-2 should be rejected")
+
+    assert asyncio.run(main()) == ["bg-1", "chat-1", "chat-2"]
+
+
+def test_streamed_result_holds_admission_slot_until_consumed():
+    balancer, _ = _balancer(1)
+    balancer.registry.set_service_config("svc", ServiceConfig(max_concurrency=1))
+    controller = balancer.registry.get_admission_controller("svc")
+
+    async def chunks():
+        for i in range(3):
+            yield i
+
+    async def request(instance):
+        return chunks()
+
+    async def main():
+        with request_priority(Priority.BACKGROUND):
+            stream = await balancer.execute("svc", request)
+        assert controller.running(Priority.BACKGROUND) == 1
+        assert [c async for c in stream] == [0, 1, 2]
+        assert controller.running() == 0
+
+    asyncio.run(main())
+
+
+def test_adaptive_concurrency_limit_follows_load():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4, min_limit=2, backoff_ratio=0.5)
+    for _ in range(4):
+        limiter.on_request_start()
+    for _ in range(4):
+        limiter.on_request_end(dropped=False, succeeded=True)
+    # the limit grows while at least half of it is in use
+    assert limiter.limit == 6
+    limiter.on_request_start()
+    limiter.on_request_end(dropped=True, succeeded=False)
+    assert limiter.limit == 3
+    # sequential requests neither grow nor shrink the limit, whatever their latency
+    for _ in range(100):
+        limiter.on_request_start()
+        limiter.on_request_end(dropped=False, succeeded=True)
+    assert limiter.limit == 3
+    limiter.on_request_start()
+    limiter.on_request_end(dropped=True, succeeded=False)
+    assert limiter.limit == 2
+
+
+def test_saturated_instance_is_skipped():
+    registry = ServiceRegistry()
+    busy = ServiceInstanceBase("busy", concurrency_limiter=AdaptiveConcurrencyLimiter("busy", initial_limit=1, min_limit=1))
+    idle = ServiceInstanceBase("idle")
+    registry.register_service("svc", busy)
+    registry.register_service("svc", idle)
+    registry.set_service_config("svc", ServiceConfig(retry_delay=0))
+    balancer = LoadBalancer(registry, strategy_type=RoundRobinStrategy)
+    release = asyncio.Event()
+
+    async def request(instance):
+        if instance is busy:
+            await release.wait()
+        return instance
+
+    async def main():
+        first = asyncio.create_task(balancer.execute("svc", request))
+        await asyncio.sleep(0)
+        # round robin would pick `busy` again for the third call
+        chosen = [await balancer.execute("svc", request) for _ in range(2)]
+        release.set()
+        return await first, chosen
+
+    first, chosen = asyncio.run(main())
+    assert first is busy
+    assert chosen == [idle, idle]
+
+
+def test_open_streams_hold_concurrency_slots():
+    registry = ServiceRegistry()
+    limiter = AdaptiveConcurrencyLimiter("streams", initial_limit=2, min_limit=1)
+    registry.register_service("svc", ServiceInstanceBase("streams", concurrency_limiter=limiter))
+    balancer = LoadBalancer(registry)
+
+    async def chunks():
+        yield "chunk"
+
+    async def request(instance):
+        return chunks()
+
+    async def main():
+        streams = [await balancer.execute("svc", request) for _ in range(2)]
+        assert limiter.in_flight == 2
+        third = asyncio.create_task(balancer.execute("svc", request))
+        await asyncio.sleep(0.02)
+        assert not third.done()
+        assert [c async for c in streams[0]] == ["chunk"]
+        streams.append(await third)
+        for stream in streams[1:]:
+            assert [c async for c in stream] == ["chunk"]
+        assert limiter.in_flight == 0
+        assert limiter.limit == 4
+
+    asyncio.run(main())
+
+
+def test_saturated_requests_wait_in_fifo_order():
+    registry = ServiceRegistry()
+    limiter = AdaptiveConcurrencyLimiter("fifo", initial_limit=1, min_limit=1, max_limit=1)
+    registry.register_service("svc", ServiceInstanceBase("fifo", concurrency_limiter=limiter))
+    balancer = LoadBalancer(registry)
+    order = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold(instance):
+            await release.wait()
+            return "held"
+
+        async def request(i):
+            async def _request(instance):
+                order.append(i)
+                return i
+            return await balancer.execute("svc", _request)
+
+        holder = asyncio.create_task(balancer.execute("svc", hold))
+        await asyncio.sleep(0)
+        waiting = []
+        for i in range(5):
+            waiting.append(asyncio.create_task(request(i)))
+            await asyncio.sleep(0)
+        release.set()
+        await holder
+        # a request arriving while others are queued does not jump the queue
+        late = asyncio.create_task(request(5))
+        assert await asyncio.gather(*waiting, late) == list(range(6))
+        assert limiter.in_flight == 0
+
+    asyncio.run(asyncio.wait_for(main(), timeout=1))
+    assert order == list(range(6))
+
+
+def test_retry_moves_to_another_instance_and_honors_retry_after():
+    balancer, (limited, other) = _balancer(2, strategy_type=RoundRobinStrategy)
+    balancer.registry.set_service_config("svc", ServiceConfig(retry_delay=0))
+    calls = []
+
+    async def request(instance):
+        calls.append(instance)
+        if instance is limited and len(calls) == 1:
+            raise LimitExceededError(retry_after=60)
+        return instance
+
+    async def main():
+        return [await balancer.execute("svc", request) for _ in range(3)]
+
+    # `limited` asked for 60s of quiet, every request goes to `other` meanwhile
+    assert asyncio.run(main()) == [other, other, other]
+    assert calls == [limited, other, other, other]
+
+
+def test_retry_budget_stops_retry_storm():
+    balancer, _ = _balancer(2)
+    balancer.registry.set_service_config(
+        "svc", ServiceConfig(retry_delay=0, retry_budget_ratio=0.5, retry_budget_min_per_second=0))
+    calls = 0
+
+    async def request(instance):
+        nonlocal calls
+        calls += 1
+        raise ServiceError
+
+    async def main():
+        for _ in range(4):
+            try:
+                await balancer.execute("svc", request)
+            except RetryBudgetExhaustedError:
+                pass
+
+    asyncio.run(main())
+    # 4 requests allow 2 retries in total, instead of 100 retries each
+    assert calls == 6
+
+
+def test_retry_after_header_is_parsed():
+    import httpx
+    import openai
+
+    from api.llm.generator import retry_after_seconds
+
+    def error(headers: dict[str, str]) -> openai.RateLimitError:
+        response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://llm.test"))
+        return openai.RateLimitError("rate limited", response=response, body=None)
+
+    assert retry_after_seconds(error({"retry-after": "3"})) == 3
+    assert retry_after_seconds(error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(error({})) is None
+
+
+def test_execute_stream_fails_over_without_duplicating_chunks():
+    balancer, (flaky, steady) = _balancer(2, strategy_type=RoundRobinStrategy)
+    resumed_from = []
+
+    async def request(instance, forwarded):
+        resumed_from.append(list(forwarded))
+        start = len(forwarded)
+
+        async def chunks():
+            for i in range(start, 5):
+                if instance is flaky and i == 2:
+                    raise ServiceError
+                yield i
+
+        return chunks()
+
+    async def main():
+        return [c async for c in balancer.execute_stream("svc", request)]
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+    assert resumed_from == [[], [0, 1]]
+
+
+def test_execute_stream_ends_when_broken_after_final_chunk():
+    from types import SimpleNamespace
+
+    balancer, _ = _balancer(2)
+    requests = []
+
+    def chunk(text, finish_reason=None):
+        return SimpleNamespace(text=text, choices=[SimpleNamespace(finish_reason=finish_reason)])
+
+    async def request(instance, forwarded):
+        requests.append(instance)
+
+        async def chunks():
+            yield chunk("hello")
+            yield chunk("", finish_reason="stop")
+            # connection reset before the usage chunk
+            raise ServiceError
+
+        return chunks()
+
+    async def main():
+        return [c.text async for c in balancer.execute_stream("svc", request)]
+
+    assert asyncio.run(main()) == ["hello", ""]
+    assert len(requests) == 1
+
+
+def test_replayed_stream_skips_forwarded_content():
+    from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+    from api.load_balance.delegate.openai import _skip_forwarded
+
+    def chunk(content: str) -> ChatCompletionChunk:
+        return ChatCompletionChunk.model_validate({
+            "id": "c", "created": 0, "model": "m", "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        })
+
+    async def replay():
+        for content in ["Hel", "lo wor", "ld"]:
+            yield chunk(content)
+
+    async def main():
+        return [c.choices[0].delta.content async for c in _skip_forwarded(replay(), 5, 0, drop_reasoning=False)]
+
+    assert "".join(asyncio.run(main())) == " world"
+
+
+def test_stream_resumes_with_prefix_only_on_declaring_instances(monkeypatch):
+    from openai import AsyncOpenAI
+    from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+    from api.load_balance.delegate import openai as delegate_module
+    from api.load_balance.service_instance import AsyncOpenAIServiceInstance
+
+    def chunk(content: str) -> ChatCompletionChunk:
+        return ChatCompletionChunk.model_validate({
+            "id": "c", "created": 0, "model": "m", "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        })
+
+    sent = []
+
+    async def fake_generate(client, model, messages, retry_configs, **kwargs):
+        sent.append(messages)
+
+        async def stream():
+            yield chunk("Hello" if messages[-1]["role"] == "user" else " world")
+        return stream()
+
+    monkeypatch.setattr(delegate_module, "openai_async_generate", fake_generate)
+    request = delegate_module.resumable_generation_delegate_for_async_openai(
+        [{"role": "user", "content": "hi"}], None, stream=True)
+    client = AsyncOpenAI(api_key="sk-test", base_url="http://localhost")
+    plain = AsyncOpenAIServiceInstance("plain", client, "m")
+    partial = AsyncOpenAIServiceInstance("partial", client, "m", assistant_prefix_field="partial")
+
+    async def resume(instance):
+        return [c.choices[0].delta.content async for c in await request(instance, [chunk("Hel")])]
+
+    # the plain instance would ignore a prefix field, so the request is replayed
+    assert asyncio.run(resume(plain)) == ["lo"]
+    assert sent[-1] == [{"role": "user", "content": "hi"}]
+    assert asyncio.run(resume(partial)) == [" world"]
+    assert sent[-1][-1] == {"role": "assistant", "content": "Hel", "partial": True}
+
+
+class _FakeEmbeddings:
+    """stands in for AsyncOpenAI().embeddings, records the inputs it was asked for"""
+    def __init__(self) -> None:
+        self.inputs: list[list[str]] = []
+
+    async def create(self, model, input, dimensions, encoding_format):
+        from openai.types import CreateEmbeddingResponse
+
+        self.inputs.append(list(input))
+        return CreateEmbeddingResponse.model_validate({
+            "object": "list",
+            "model": model,
+            "data": [{"object": "embedding", "index": i, "embedding": [float(len(t)), 1.0]}
+                     for i, t in enumerate(input)],
+            "usage": {"prompt_tokens": len(input), "total_tokens": len(input)},
+        })
+
+
+def test_embedding_cache_embeds_only_misses():
+    from types import SimpleNamespace
+
+    from api.llm.embedding_cache import EmbeddingCache
+    from api.load_balance.embedding_batcher import embed_with_cache
+    from api.load_balance.service_instance import AsyncOpenAIServiceInstance
+
+    embeddings = _FakeEmbeddings()
+    instance = AsyncOpenAIServiceInstance("fake", SimpleNamespace(embeddings=embeddings), "text-embedding")
+    registry = ServiceRegistry()
+    registry.register_service("embed", instance)
+    balancer = LoadBalancer(registry)
+    cache = EmbeddingCache(use_redis=False)
+
+    async def main():
+        await embed_with_cache(balancer, "embed", ["a", "bb"], cache=cache)
+        second = await embed_with_cache(balancer, "embed", ["bb", "ccc", "ccc"], cache=cache)
+        third = await embed_with_cache(balancer, "embed", ["a", "ccc"], cache=cache)
+        return second, third
+
+    second, third = asyncio.run(main())
+    assert embeddings.inputs == [["a", "bb"], ["ccc"]]
+    assert [v[0] for v in second] == [2.0, 3.0, 3.0]
+    assert [v[0] for v in third] == [1.0, 3.0]
+    # the fully cached call never reached the balancer, only the two real calls were sampled
+    assert len(registry.get_latency_window(instance)) == 2
+
+
+class _FakeRedis:
+    """stands in for the redis client, keeps the raw bytes in a dict"""
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        values = self.values
+
+        class _Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            def set(self, key, value, ex=None):
+                values[key] = value
+
+            async def execute(self):
+                pass
+
+        return _Pipeline()
+
+
+def test_embedding_cache_tiers_return_the_same_vector():
+    from api.llm.embedding_cache import EmbeddingCache
+
+    redis = _FakeRedis()
+    vector = [0.1, 1 / 3, -2.5e-8]
+
+    async def main():
+        await EmbeddingCache(client=redis).set_many({"k": vector})
+        # a fresh process only finds the vector in redis
+        return await EmbeddingCache(client=redis).get_many(["k"])
+
+    assert asyncio.run(main()) == {"k": vector}
+
+
+def test_embedding_micro_batcher_coalesces_concurrent_texts():
+    from types import SimpleNamespace
+
+    from api.llm.embedding_cache import EmbeddingCache
+    from api.load_balance.embedding_batcher import EmbeddingMicroBatcher
+    from api.load_balance.service_instance import AsyncOpenAIServiceInstance
+
+    embeddings = _FakeEmbeddings()
+    registry = ServiceRegistry()
+    registry.register_service("embed", AsyncOpenAIServiceInstance(
+        "fake", SimpleNamespace(embeddings=embeddings), "text-embedding"))
+    batcher = EmbeddingMicroBatcher(LoadBalancer(registry), "embed",
+                                    max_batch_size=3, cache=EmbeddingCache(use_redis=False))
+
+    async def main():
+        texts = ["a", "bb", "ccc", "dddd"]
+        return await asyncio.gather(*[batcher.embed(t) for t in texts])
+
+    vectors = asyncio.run(main())
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0]
+    # three texts fill a batch, the fourth one is sent after the linger time
+    assert embeddings.inputs == [["a", "bb", "ccc"], ["dddd"]]
+
+
+def test_response_cache_shares_in_flight_calls():
+    from api.llm.response_cache import ResponseCache, make_response_cache_key
+
+    calls = []
+
+    async def request():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return f"response {len(calls)}"
+
+    cache = ResponseCache()
+    messages = [{"role": "user", "content": "extract"}]
+    key = make_response_cache_key("svc", messages, {"temperature": 0})
+    other_key = make_response_cache_key("svc", messages, {"temperature": 1})
+    assert key != other_key
+
+    async def main():
+        concurrent = await asyncio.gather(cache.get_or_create(key, request), cache.get_or_create(key, request))
+        cached = await cache.get_or_create(key, request)
+        # rejected results are shared with concurrent callers but never stored
+        rejected = await cache.get_or_create(other_key, request, cacheable=lambda value: False)
+        regenerated = await cache.get_or_create(other_key, request)
+        return concurrent, cached, rejected, regenerated
+
+    concurrent, cached, rejected, regenerated = asyncio.run(main())
+    assert concurrent == ["response 1", "response 1"]
+    assert cached == "response 1"
+    assert (rejected, regenerated) == ("response 2", "response 3")
+    assert len(calls) == 3
+
+
+def test_json_extract_uses_native_structured_output_in_one_call():
+    from types import SimpleNamespace
+
+    from pydantic import BaseModel
+
+    from api.load_balance import LOAD_BLANCER
+    from api.load_balance.service_instance import AsyncOpenAIServiceInstance
+    from api.workflow.json_extract import extract_json_with_retry
+
+    class Contract(BaseModel):
+        party: str
+        amount: int
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content='{"party": "ACME", "amount": 3}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    instance = AsyncOpenAIServiceInstance("fake", client, "fake-model", structured_output="json_object")
+    LOAD_BLANCER.registry.register_service("structured-output-svc", instance)
+
+    result = asyncio.run(extract_json_with_retry("structured-output-svc", "ACME pays 3", Contract))
+
+    assert result == Contract(party="ACME", amount=3)
+    assert len(calls) == 1
+    assert calls[0]["response_format"] == {"type": "json_object"}
+
+    # a repeated extraction is served from the response cache before the balancer
+    assert asyncio.run(extract_json_with_retry("structured-output-svc", "ACME pays 3", Contract)) == result
+    assert len(calls) == 1
+    assert len(LOAD_BLANCER.registry.get_latency_window(instance)) == 1
+
+
+def test_json_extract_does_not_cache_invalid_responses():
+    from types import SimpleNamespace
+
+    import pytest
+    from pydantic import BaseModel
+
+    from api.load_balance import LOAD_BLANCER
+    from api.load_balance.service_instance import AsyncOpenAIServiceInstance
+    from api.workflow.json_extract import FailedToExtractJsonError, extract_json_with_retry
+
+    class Invoice(BaseModel):
+        total: int
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content='{"total": "unknown"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    instance = AsyncOpenAIServiceInstance("fake", client, "fake-model", structured_output="json_object")
+    LOAD_BLANCER.registry.register_service("invalid-output-svc", instance)
+
+    for _ in range(2):
+        with pytest.raises(FailedToExtractJsonError):
+            asyncio.run(extract_json_with_retry("invalid-output-svc", "total unknown", Invoice, max_retries=0))
+    assert len(calls) == 2
+
+
+def test_shared_http_clients_are_per_host_and_survive_lifespans():
+    import httpx
+
+    from api.llm.http_transport import SharedHttpClients
+
+    def handler(request):
+        return httpx.Response(200, text=request.url.host)
+
+    class MockTransports(SharedHttpClients):
+        def transport_for(self, host):
+            if host not in self._transports:
+                self._transports[host] = httpx.MockTransport(handler)
+            return self._transports[host]
+
+    clients = MockTransports(metrics_interval=0.01)
+    first = clients.client_for("https://api.example.com/v1")
+    assert clients.client_for("https://api.example.com/v2") is first
+    other = clients.client_for("https://other.example.com")
+    assert other is not first
+
+    # each lifespan opens the pools in start() and closes them in aclose(),
+    # the clients handed out at import time keep working in the next lifespan
+    for _ in range(2):
+        async def lifespan():
+            clients.start()
+            assert set(clients._transports) == {"api.example.com", "other.example.com"}
+            assert (await first.get("https://api.example.com/v1/models")).text == "api.example.com"
+            await asyncio.sleep(0.02)
+            await clients.aclose()
+            assert clients._transports == {}
+            assert not first.is_closed
+
+        asyncio.run(lifespan())
+
+    async def pools():
+        real = SharedHttpClients()
+        real.client_for("https://api.example.com/v1")
+        real.start()
+        assert set(real.pool_stats()) == {"api.example.com"}
+        await real.aclose()
+        assert real.pool_stats() == {}
+
+    asyncio.run(pools())